@@ -1,50 +1,20 @@
-"""Small migration script to add tags, event_date, event_time columns to notes table in SQLite.
+"""Bring the database schema up to date by applying the versioned migrations in src/migrations.
 
-Usage: run this once after pulling changes:
-    python scripts/add_note_fields_migration.py
+This script used to add the tags, position, event_date and event_time columns by hand; that is now migration 0002,
+applied together with the rest of the schema history. Equivalent to `flask --app src.main migrate`.
 
-It will check if columns exist and add them if missing.
+Usage (uses DATABASE_URL if set, otherwise the local SQLite database):
+    python scripts/add_note_fields_migration.py
 """
-import sqlite3
 import os
+import sys
 
-ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
-DB_PATH = os.path.join(ROOT, 'database', 'app.db')
-
-if not os.path.exists(DB_PATH):
-    print(f"Database not found at {DB_PATH}")
-    raise SystemExit(1)
-
-conn = sqlite3.connect(DB_PATH)
-cur = conn.cursor()
-
-# get current columns
-cur.execute("PRAGMA table_info(note);")
-cols = [r[1] for r in cur.fetchall()] if cur.description is not None else []
-print("Existing columns:", cols)
-
-# map of column -> SQL to add
-to_add = {}
-if 'tags' not in cols:
-    to_add['tags'] = "ALTER TABLE note ADD COLUMN tags TEXT"
-if 'position' not in cols:
-    to_add['position'] = "ALTER TABLE note ADD COLUMN position INTEGER"
-if 'event_date' not in cols:
-    to_add['event_date'] = "ALTER TABLE note ADD COLUMN event_date DATE"
-if 'event_time' not in cols:
-    to_add['event_time'] = "ALTER TABLE note ADD COLUMN event_time TIME"
+# Add the parent directory to the path so we can import our models
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+os.environ.setdefault('AUTO_MIGRATE', 'false')
 
-if not to_add:
-    print("No migration necessary. All columns exist.")
-else:
-    for name, sql in to_add.items():
-        try:
-            print(f"Adding column {name}...")
-            cur.execute(sql)
-            conn.commit()
-            print(f"Column {name} added.")
-        except Exception as e:
-            print(f"Failed to add {name}:", e)
+from src.main import app, migrate_database
 
-conn.close()
-print("Migration complete.")
+if __name__ == '__main__':
+    applied = migrate_database(app)
+    print(f"Migration complete. {len(applied)} migration(s) applied.")
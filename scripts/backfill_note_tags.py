@@ -0,0 +1,20 @@
+"""Create the note_tags table and backfill it from notes.tags.
+
+The backfill is migration 0003 in src/migrations/versions.py, so this applies all pending migrations (equivalent to
+`flask --app src.main migrate`). Safe to run again.
+
+Usage (uses DATABASE_URL if set, otherwise the local SQLite database):
+    python scripts/backfill_note_tags.py
+"""
+import os
+import sys
+
+# Add the parent directory to the path so we can import our models
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+os.environ.setdefault('AUTO_MIGRATE', 'false')
+
+from src.main import app, migrate_database
+
+if __name__ == '__main__':
+    applied = migrate_database(app)
+    print(f"Migration complete. {len(applied)} migration(s) applied.")
@@ -0,0 +1,79 @@
+"""Micro-benchmark for note list serialization.
+
+Compares the ORM path (Note objects -> to_dict() -> jsonify) with the Core path used by the list endpoints
+(column rows -> serialize_rows() -> orjson, or stdlib json without orjson), against a throwaway SQLite database.
+
+Usage:
+    python scripts/bench_serialization.py [--notes 20000] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+# Add the parent directory to the path so we can import our models
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+
+def best_of(repeat, fn):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--notes', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    os.environ.setdefault('GITHUB_TOKEN', 'unused')
+
+    from flask import jsonify
+    from sqlalchemy import select
+    from src.main import app
+    from src.models.note import Note, db
+    from src import serialization
+    from src.serialization import serialize_rows, json_response
+    from src.routes.note import NOTE_FIELDS, _insert_notes
+
+    with app.app_context():
+        _insert_notes([{'title': f'Note {i}', 'content': 'Lorem ipsum dolor sit amet. ' * 8,
+                        'tags': 'work,ideas,2024'} for i in range(args.notes)])
+        db.session.commit()
+        columns = [Note.__table__.c[f] for f in NOTE_FIELDS]
+
+        def orm_path():
+            notes = Note.query.order_by(Note.position).all()
+            jsonify([n.to_dict() for n in notes]).get_data()
+            db.session.expunge_all()
+
+        def core_path():
+            rows = db.session.execute(select(*columns).order_by(Note.__table__.c.position)).all()
+            json_response(serialize_rows(rows, NOTE_FIELDS)).get_data()
+
+        results = [('ORM + to_dict + jsonify', best_of(args.repeat, orm_path))]
+        encoder = 'orjson' if serialization.orjson is not None else 'json'
+        results.append((f'Core rows + serialize_rows + {encoder}', best_of(args.repeat, core_path)))
+        if serialization.orjson is not None:
+            orjson, serialization.orjson = serialization.orjson, None
+            results.append(('Core rows + serialize_rows + json', best_of(args.repeat, core_path)))
+            serialization.orjson = orjson
+
+        client = app.test_client()
+        results.append(('GET /api/notes (end to end)', best_of(args.repeat, lambda: client.get('/api/notes').get_data())))
+
+    baseline = results[0][1]
+    print(f'{args.notes} notes, best of {args.repeat}')
+    for name, seconds in results:
+        print(f'  {name:<40} {seconds * 1000:9.1f} ms  {baseline / seconds:5.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""Concurrency benchmark for the SQLite profile in src/db_config.py.
+
+Runs the same multi-threaded load twice against a fresh SQLite file: once with SQLite's defaults
+(SQLITE_TUNING=false: rollback journal, synchronous=FULL) and once with the tuned profile (WAL, synchronous=NORMAL,
+busy_timeout, ...). Writer threads auto-save notes with PATCH /api/notes/<id> while reader threads page through
+GET /api/notes, each thread with its own Flask test client. Reports write and read throughput, latency and
+failed requests ("database is locked" surfaces as a 500).
+
+Each profile runs in a child process, since the profile is read from the environment when the app starts.
+Put --dir on the disk the app will use: fsync cost, which the profile mostly saves, depends on it.
+
+Usage:
+    python scripts/bench_sqlite_concurrency.py [--writers 8] [--readers 4] [--seconds 10] [--notes 2000]
+                                               [--dir /path/on/target/disk]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+# Add the parent directory to the path so we can import our models
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+PROFILES = {'default': 'false', 'tuned': 'true'}
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * pct / 100))] * 1000, 2)
+
+
+def run_load(args):
+    """Child process: seed, run the threads for --seconds, print one JSON line of results"""
+    from src.main import create_app
+    from src.models.note import db
+    from src.routes.note import _insert_notes
+    from sqlalchemy import text
+
+    app = create_app()
+    with app.app_context():
+        note_ids = _insert_notes([{'title': f'Note {i}', 'content': 'draft ' * 50} for i in range(args.notes)])
+        db.session.commit()
+        journal_mode = db.session.execute(text('PRAGMA journal_mode')).scalar()
+
+    results = {'write': [], 'read': []}
+    errors = {'write': 0, 'read': 0}
+    lock = threading.Lock()
+    stop = time.perf_counter() + args.seconds
+
+    def worker(kind, seed):
+        rng = random.Random(seed)
+        client = app.test_client()
+        latencies, failed = [], 0
+        i = 0
+        while time.perf_counter() < stop:
+            i += 1
+            started = time.perf_counter()
+            if kind == 'write':
+                response = client.patch(f'/api/notes/{rng.choice(note_ids)}',
+                                        json={'content': f'autosave {seed}-{i} ' + 'text ' * 50})
+            else:
+                response = client.get('/api/notes?limit=50')
+            response.get_data()
+            latencies.append(time.perf_counter() - started)
+            failed += response.status_code >= 500
+        with lock:
+            results[kind].extend(latencies)
+            errors[kind] += failed
+
+    threads = [threading.Thread(target=worker, args=('write', n)) for n in range(args.writers)]
+    threads += [threading.Thread(target=worker, args=('read', 1000 + n)) for n in range(args.readers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    report = {'journal_mode': journal_mode}
+    for kind in ('write', 'read'):
+        latencies = results[kind]
+        report[kind] = {
+            'requests': len(latencies),
+            'errors': errors[kind],
+            'per_second': round(len(latencies) / args.seconds, 1),
+            'p50_ms': percentile(latencies, 50),
+            'p95_ms': percentile(latencies, 95),
+            'mean_ms': round(statistics.fmean(latencies) * 1000, 2) if latencies else None,
+        }
+    print(json.dumps(report))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare default and tuned SQLite under concurrent load')
+    parser.add_argument('--writers', type=int, default=8, help='threads saving notes')
+    parser.add_argument('--readers', type=int, default=4, help='threads listing notes')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--notes', type=int, default=2000, help='notes to seed')
+    parser.add_argument('--dir', help='directory for the database files (default: a temporary directory)')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_load(args)
+        return
+
+    reports = {}
+    for profile, tuning in PROFILES.items():
+        directory = tempfile.mkdtemp(dir=args.dir)
+        env = dict(os.environ, SQLITE_TUNING=tuning, GITHUB_TOKEN=os.getenv('GITHUB_TOKEN', 'unused'),
+                   DATABASE_URL=f"sqlite:///{os.path.join(directory, 'bench.db')}", SLOW_REQUEST_MS='0',
+                   SLOW_QUERY_MS='0')
+        command = [sys.executable, os.path.abspath(__file__), '--child', '--writers', str(args.writers),
+                   '--readers', str(args.readers), '--seconds', str(args.seconds), '--notes', str(args.notes)]
+        result = subprocess.run(command, env=env, cwd=ROOT_DIR, capture_output=True, text=True)
+        if result.returncode != 0:
+            print(result.stderr)
+            sys.exit(f'{profile} run failed (exit code {result.returncode})')
+        reports[profile] = report = json.loads(result.stdout.strip().splitlines()[-1])
+        print(f"{profile:<8} (journal_mode={report['journal_mode']}, {args.writers} writers, {args.readers} readers)")
+        for kind in ('write', 'read'):
+            r = report[kind]
+            print(f"  {kind:<5} {r['per_second']:>8.1f} req/s  p50 {r['p50_ms']:>8.2f}ms  p95 {r['p95_ms']:>8.2f}ms  "
+                  f"errors {r['errors']}")
+
+    before, after = reports['default']['write']['per_second'], reports['tuned']['write']['per_second']
+    if before:
+        print(f"Write throughput: {after / before:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,220 @@
+"""Benchmark and load-test harness for the notes API.
+
+Seeds N notes into a throwaway SQLite database (or the database given with --database-url, which should be a
+scratch PostgreSQL database: notes are added to it and not removed), then drives the main note endpoints through
+the Flask test client and through a real WSGI server on localhost, and reports throughput and p50/p95/p99 latency.
+
+Usage:
+    python scripts/benchmark.py [--notes 10000] [--requests 200] [--concurrency 4] [--mode both]
+                                [--database-url postgresql://localhost/notes_bench]
+                                [--output benchmark.json] [--compare previous.json]
+
+Results are written as JSON (with the git commit), so runs from different commits can be compared with --compare.
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the parent directory to the path so we can import our models
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+WORDS = ['meeting', 'project', 'badminton', 'groceries', 'deadline', 'travel', 'budget', 'lecture', 'dentist', 'ideas']
+
+
+def make_scenarios(note_ids, rng):
+    """name -> function(i) returning (method, path, json body or None)"""
+    def pick():
+        return rng.choice(note_ids)
+
+    return {
+        'get_notes_page': lambda i: ('GET', '/api/notes?limit=50', None),
+        'get_notes_all': lambda i: ('GET', '/api/notes', None),
+        'search_notes': lambda i: ('GET', f'/api/notes/search?q={WORDS[i % len(WORDS)]}', None),
+        'create_note': lambda i: ('POST', '/api/notes', {
+            'title': f'Benchmark {i}', 'content': ' '.join(rng.choices(WORDS, k=30)), 'tags': ['bench']}),
+        'update_note': lambda i: ('PUT', f'/api/notes/{pick()}', {
+            'title': f'Updated {i}', 'content': ' '.join(rng.choices(WORDS, k=30))}),
+        'reorder_notes': lambda i: ('POST', '/api/notes/reorder', {'id': pick(), 'after': pick()}),
+    }
+
+
+def summarize(latencies, errors, elapsed):
+    ms = sorted(t * 1000 for t in latencies)
+    cuts = statistics.quantiles(ms, n=100, method='inclusive') if len(ms) > 1 else ms * 99
+    return {
+        'requests': len(ms),
+        'errors': errors,
+        'seconds': round(elapsed, 4),
+        'throughput_rps': round(len(ms) / elapsed, 2) if elapsed else None,
+        'latency_ms': {
+            'mean': round(statistics.fmean(ms), 3),
+            'p50': round(cuts[49], 3),
+            'p95': round(cuts[94], 3),
+            'p99': round(cuts[98], 3),
+            'max': round(ms[-1], 3),
+        },
+    }
+
+
+def run_test_client(app, scenario, count):
+    """Sequential requests through the Flask test client (no network, no concurrency)"""
+    client = app.test_client()
+    latencies, errors = [], 0
+    started = time.perf_counter()
+    for i in range(count):
+        method, path, body = scenario(i)
+        t = time.perf_counter()
+        response = client.open(path, method=method, json=body)
+        response.get_data()
+        latencies.append(time.perf_counter() - t)
+        errors += response.status_code >= 400
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+def run_server(port, scenario, count, concurrency):
+    """Requests over keep-alive HTTP connections to the WSGI server, from `concurrency` threads"""
+    local = threading.local()
+
+    def one(i):
+        method, path, body = scenario(i)
+        if not hasattr(local, 'conn'):
+            local.conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        payload = json.dumps(body).encode() if body is not None else None
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        t = time.perf_counter()
+        local.conn.request(method, path, body=payload, headers=headers)
+        response = local.conn.getresponse()
+        response.read()
+        return time.perf_counter() - t, response.status >= 400
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(count)))
+    elapsed = time.perf_counter() - started
+    return summarize([t for t, _ in results], sum(e for _, e in results), elapsed)
+
+
+def start_server(app):
+    from werkzeug.serving import make_server, WSGIRequestHandler
+
+    class KeepAliveHandler(WSGIRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=KeepAliveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR, text=True).strip()
+    except Exception:
+        return None
+
+
+def compare(previous_path, report):
+    """Print the change of p50/p95 latency and throughput against a previous report"""
+    with open(previous_path) as f:
+        previous = {(r['mode'], r['scenario']): r for r in json.load(f)['results']}
+    print(f"\nCompared with {previous_path}:")
+    for r in report['results']:
+        old = previous.get((r['mode'], r['scenario']))
+        if not old:
+            continue
+        changes = []
+        for key in ('p50', 'p95'):
+            before, after = old['latency_ms'][key], r['latency_ms'][key]
+            changes.append(f"{key} {(after - before) / before * 100:+6.1f}%" if before else f"{key} n/a")
+        before, after = old['throughput_rps'], r['throughput_rps']
+        changes.append(f"rps {(after - before) / before * 100:+6.1f}%" if before else "rps n/a")
+        print(f"  {r['mode']:<11} {r['scenario']:<15} " + '  '.join(changes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the notes API')
+    parser.add_argument('--notes', type=int, default=10000, help='notes to seed before measuring')
+    parser.add_argument('--requests', type=int, default=200, help='requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=4, help='client threads against the WSGI server')
+    parser.add_argument('--mode', choices=['client', 'server', 'both'], default='both')
+    parser.add_argument('--scenarios', help='comma separated subset of scenarios')
+    parser.add_argument('--database-url', help='database to benchmark (default: a temporary SQLite file)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='benchmark.json')
+    parser.add_argument('--compare', help='previous JSON report to compare against')
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    os.environ.setdefault('GITHUB_TOKEN', 'unused')
+
+    from src.main import app
+    from src.models.note import db
+    from src.routes.note import _insert_notes
+
+    rng = random.Random(args.seed)
+    with app.app_context():
+        started = time.perf_counter()
+        note_ids = _insert_notes([{
+            'title': f'Note {i} {rng.choice(WORDS)}',
+            'content': ' '.join(rng.choices(WORDS, k=40)),
+            'tags': ','.join(rng.sample(WORDS, 2)),
+        } for i in range(args.notes)])
+        db.session.commit()
+        seed_seconds = time.perf_counter() - started
+        dialect = db.engine.dialect.name
+    print(f"Seeded {args.notes} notes into {dialect} in {seed_seconds:.2f}s")
+
+    scenarios = make_scenarios(note_ids, rng)
+    if args.scenarios:
+        scenarios = {name: scenarios[name] for name in args.scenarios.split(',')}
+
+    results = []
+    modes = ['client', 'server'] if args.mode == 'both' else [args.mode]
+    server = start_server(app) if 'server' in modes else None
+    for mode in modes:
+        for name, scenario in scenarios.items():
+            if mode == 'client':
+                summary = run_test_client(app, scenario, args.requests)
+            else:
+                summary = run_server(server.server_port, scenario, args.requests, args.concurrency)
+            results.append({'mode': mode, 'scenario': name, **summary})
+            lat = summary['latency_ms']
+            print(f"  {mode:<7} {name:<15} {summary['throughput_rps']:>9.1f} req/s  "
+                  f"p50 {lat['p50']:>8.2f}ms  p95 {lat['p95']:>8.2f}ms  p99 {lat['p99']:>8.2f}ms  "
+                  f"errors {summary['errors']}")
+    if server:
+        server.shutdown()
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'database': dialect,
+        'notes': args.notes,
+        'requests_per_scenario': args.requests,
+        'concurrency': args.concurrency,
+        'seed_seconds': round(seed_seconds, 3),
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+    if args.compare:
+        compare(args.compare, report)
+
+
+if __name__ == '__main__':
+    main()
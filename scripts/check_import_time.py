@@ -0,0 +1,90 @@
+"""Measure the cold-start import time of the app against a budget.
+
+Imports the serverless entry point (api/index.py) in fresh Python processes, the way a cold start would, and fails
+if the median time is over budget or if modules that should load lazily (the openai SDK) were imported.
+The database is a throwaway SQLite file with AUTO_MIGRATE off, as on a deployed function.
+
+Usage:
+    python scripts/check_import_time.py [--budget-ms 750] [--runs 5] [--top 10]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# modules that must not be imported just to start the app
+LAZY_MODULES = ['openai', 'httpx', 'src.llm']
+
+PROBE = f'''
+import json, sys, time
+sys.path.insert(0, {ROOT_DIR!r})
+start = time.perf_counter()
+import api.index
+elapsed = time.perf_counter() - start
+print(json.dumps({{"ms": elapsed * 1000, "loaded": [m for m in {LAZY_MODULES!r} if m in sys.modules]}}))
+'''
+
+
+def probe_env():
+    env = dict(os.environ)
+    env['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'cold.db')}"
+    env['AUTO_MIGRATE'] = 'false'
+    env.pop('GITHUB_TOKEN', None)  # the app must start without it
+    return env
+
+
+def slowest_imports(env, top):
+    """(cumulative ms, module) of the slowest imports below api.index, from python -X importtime"""
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', PROBE], env=env, cwd=ROOT_DIR,
+                            capture_output=True, text=True).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        rows.append((int(cumulative) / 1000, name.rstrip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check cold-start import time')
+    parser.add_argument('--budget-ms', type=float, default=float(os.getenv('IMPORT_BUDGET_MS', '750')))
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10, help='slowest imports to list')
+    args = parser.parse_args()
+
+    env = probe_env()
+    timings, loaded = [], set()
+    for _ in range(args.runs):
+        result = subprocess.run([sys.executable, '-c', PROBE], env=env, cwd=ROOT_DIR, capture_output=True, text=True)
+        if result.returncode != 0:
+            print(result.stderr)
+            sys.exit(f'Importing the app failed (exit code {result.returncode})')
+        data = json.loads(result.stdout.strip().splitlines()[-1])
+        timings.append(data['ms'])
+        loaded.update(data['loaded'])
+
+    median = statistics.median(timings)
+    print(f"Import time over {args.runs} runs: median {median:.0f}ms, "
+          f"min {min(timings):.0f}ms, max {max(timings):.0f}ms (budget {args.budget_ms:.0f}ms)")
+    print("Slowest imports:")
+    for ms, name in slowest_imports(env, args.top):
+        print(f"  {ms:8.1f}ms  {name}")
+
+    failures = []
+    if median > args.budget_ms:
+        failures.append(f'median import time {median:.0f}ms is over the {args.budget_ms:.0f}ms budget')
+    if loaded:
+        failures.append(f"imported eagerly: {', '.join(sorted(loaded))}")
+    if failures:
+        sys.exit('FAIL: ' + '; '.join(failures))
+    print('OK')
+
+
+if __name__ == '__main__':
+    main()
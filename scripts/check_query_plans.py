@@ -0,0 +1,224 @@
+"""Check that the queries behind the note API are answered from indexes.
+
+Seeds a large notes table into a throwaway SQLite database (and, with --database-url, into a scratch PostgreSQL
+database), sends each request in check_requests() through the Flask test client while recording the SQL it runs,
+then EXPLAINs every recorded statement: EXPLAIN QUERY PLAN on SQLite, EXPLAIN (FORMAT JSON) on PostgreSQL.
+A plan fails the check if it sorts the rows of a full scan of a seeded table, i.e. a query that gets slower with
+every note added. Requests that return every note by design (GET /api/notes without limit, export) are not checked.
+
+Usage:
+    python scripts/check_query_plans.py [--notes 50000] [--database-url postgresql://localhost/notes_plans] [-v]
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+
+# Add the parent directory to the path so we can import our models
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+# tables that get large; full scans of the small ones are fine
+SEEDED_TABLES = ('notes', 'note_tags')
+COMMON_WORDS = ['meeting', 'project', 'groceries', 'deadline', 'travel', 'budget', 'lecture', 'ideas']
+# search term and tag carried by ~1% of the notes, so the index is the right plan for them
+RARE_WORD = 'badminton'
+RARE_TAG = 'dentist'
+
+
+def seed(app, count, rng):
+    """Insert `count` notes with timestamps spread over the past `count` minutes. Returns the note ids."""
+    from sqlalchemy import text
+    from src.models.note import db
+    from src.routes.note import _insert_notes
+
+    with app.app_context():
+        rows = []
+        for i in range(count):
+            rare = i % 100 == 0
+            words = rng.choices(COMMON_WORDS, k=30) + ([RARE_WORD] if rare else [])
+            rows.append({
+                'title': f'Note {i} {rng.choice(COMMON_WORDS)}',
+                'content': ' '.join(words),
+                'tags': ','.join(rng.sample(COMMON_WORDS, 2) + ([RARE_TAG] if rare else [])),
+            })
+        note_ids = _insert_notes(rows)
+        if db.engine.dialect.name == 'postgresql':
+            db.session.execute(text("UPDATE notes SET updated_at = now() - (:n - id) * interval '1 minute'"),
+                               {'n': max(note_ids)})
+        else:
+            db.session.execute(text("UPDATE notes SET updated_at = datetime('now', '-' || (:n - id) || ' minutes')"),
+                               {'n': max(note_ids)})
+        db.session.commit()
+        if db.engine.dialect.name == 'postgresql':
+            # the planner needs statistics for the bulk-loaded rows (autovacuum would collect them eventually)
+            db.session.execute(text('ANALYZE notes'))
+            db.session.execute(text('ANALYZE note_tags'))
+            db.session.commit()
+    return note_ids
+
+
+def check_requests(client, note_ids, rng):
+    """Yield (label, method, path, json body) of the requests to check. Some depend on earlier responses."""
+    def pick():
+        return rng.choice(note_ids)
+
+    first_page = client.get('/api/notes?limit=50')
+    yield 'list page', 'GET', '/api/notes?limit=50', None
+    yield 'list next page', 'GET', f"/api/notes?limit=50&cursor={first_page.headers['X-Next-Cursor']}", None
+    yield 'list projection', 'GET', '/api/notes?limit=50&fields=id,title,preview', None
+    yield 'get note', 'GET', f'/api/notes/{pick()}', None
+    yield 'changes since', 'GET', f"/api/notes/changes?since={int(first_page.headers['X-Sync-Cursor']) - 50}", None
+    yield 'search text', 'GET', f'/api/notes/search?q={RARE_WORD}&limit=20', None
+    yield 'search tag', 'GET', f'/api/notes/search?tag={RARE_TAG}&limit=20', None
+    yield 'tag counts', 'GET', '/api/tags', None
+    yield 'create note', 'POST', '/api/notes', {'title': 'Plan check', 'content': 'new note', 'tags': ['plan']}
+    yield 'update note', 'PUT', f'/api/notes/{pick()}', {'title': 'Updated', 'content': 'changed', 'tags': ['x']}
+    yield 'patch note', 'PATCH', f'/api/notes/{pick()}', {'title': 'Patched'}
+    yield 'move note', 'POST', '/api/notes/reorder', {'id': pick(), 'after': pick()}
+    yield 'move to top', 'POST', '/api/notes/reorder', {'id': pick(), 'after': None}
+    yield 'batch', 'POST', '/api/notes/batch', {'operations': [
+        {'op': 'create', 'title': 'Batch', 'content': 'created'},
+        {'op': 'update', 'id': pick(), 'title': 'Batch update'},
+        {'op': 'delete', 'id': pick()},
+    ]}
+    yield 'delete note', 'DELETE', f'/api/notes/{pick()}', None
+
+
+def record_statements(app, note_ids, rng):
+    """Run the requests and return [(label, statement, parameters)] of the distinct statements they executed"""
+    from sqlalchemy import event
+    from src.models.note import db
+
+    recorded = []
+    current = {}
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and current.get('label') and \
+                statement.lstrip().split(None, 1)[0].upper() in ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE'):
+            recorded.append((current['label'], statement, parameters))
+
+    client = app.test_client()
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        for label, method, path, body in check_requests(client, note_ids, rng):
+            current['label'] = label
+            response = client.open(path, method=method, json=body)
+            response.get_data()
+            current['label'] = None
+            if response.status_code >= 400:
+                raise RuntimeError(f'{label}: {method} {path} returned {response.status_code}')
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+    seen = set()
+    distinct = []
+    for label, statement, parameters in recorded:
+        if (label, statement) not in seen:
+            seen.add((label, statement))
+            distinct.append((label, statement, parameters))
+    return distinct
+
+
+def sqlite_problems(cursor, statement, parameters):
+    """EXPLAIN QUERY PLAN lines, and a problem if a seeded table is scanned without an index and then sorted"""
+    cursor.execute('EXPLAIN QUERY PLAN ' + statement, parameters)
+    details = [row[3] for row in cursor.fetchall()]
+    scanned = [m.group(1) for m in (re.match(r'SCAN (\w+)$', d) for d in details) if m]
+    problems = []
+    if any(t in SEEDED_TABLES for t in scanned) and any('TEMP B-TREE FOR ORDER BY' in d for d in details):
+        problems.append(f"full scan of {', '.join(t for t in scanned if t in SEEDED_TABLES)} followed by a sort")
+    return details, problems
+
+
+def postgres_problems(cursor, statement, parameters):
+    """Plan lines, and a problem for every Sort that reads a Seq Scan of a seeded table (aggregates reset it)"""
+    cursor.execute('EXPLAIN (FORMAT JSON) ' + statement, parameters)
+    result = cursor.fetchone()[0]
+    plan = (json.loads(result) if isinstance(result, str) else result)[0]['Plan']
+    lines, problems = [], []
+
+    def seq_scans_below(node):
+        if node['Node Type'] == 'Seq Scan':
+            return [node['Relation Name']] if node.get('Relation Name') in SEEDED_TABLES else []
+        if node['Node Type'] == 'Aggregate':
+            return []
+        return [t for child in node.get('Plans', []) for t in seq_scans_below(child)]
+
+    def walk(node, depth):
+        relation = f" on {node['Relation Name']}" if node.get('Relation Name') else ''
+        index = f" using {node['Index Name']}" if node.get('Index Name') else ''
+        lines.append('  ' * depth + f"{node['Node Type']}{relation}{index}")
+        if node['Node Type'] in ('Sort', 'Incremental Sort'):
+            tables = seq_scans_below(node)
+            if tables:
+                problems.append(f"sort over a sequential scan of {', '.join(tables)}")
+        for child in node.get('Plans', []):
+            walk(child, depth + 1)
+
+    walk(plan, 0)
+    return lines, problems
+
+
+def check_database(database_url, notes, rng, verbose):
+    """Seed, run and explain on one database. Returns the number of failing statements."""
+    os.environ['DATABASE_URL'] = database_url
+    os.environ['AUTO_MIGRATE'] = 'true'  # create the schema on startup (PostgreSQL is not migrated by default)
+    from src.main import create_app
+    from src.models.note import db
+
+    app = create_app()
+    note_ids = seed(app, notes, rng)
+    statements = record_statements(app, note_ids, rng)
+
+    with app.app_context():
+        dialect = db.engine.dialect.name
+        explain = postgres_problems if dialect == 'postgresql' else sqlite_problems
+        connection = db.engine.raw_connection()
+    print(f"\n{dialect}: {notes} notes, {len(statements)} statements")
+    failures = 0
+    try:
+        cursor = connection.cursor()
+        for label, statement, parameters in statements:
+            lines, problems = explain(cursor, statement, parameters)
+            status = 'FAIL' if problems else 'ok'
+            failures += bool(problems)
+            print(f"  {status:<4} {label:<16} {' '.join(statement.split())[:90]}")
+            if problems or verbose:
+                for problem in problems:
+                    print(f"         -> {problem}")
+                for line in lines:
+                    print(f"         | {line}")
+        connection.rollback()
+    finally:
+        connection.close()
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fail if API queries sort full table scans')
+    parser.add_argument('--notes', type=int, default=50000, help='notes to seed')
+    parser.add_argument('--database-url', help='scratch PostgreSQL database to check as well (notes are added)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('-v', '--verbose', action='store_true', help='print every plan')
+    args = parser.parse_args()
+
+    os.environ.setdefault('GITHUB_TOKEN', 'unused')
+    os.environ.setdefault('SLOW_QUERY_MS', '0')  # seeding is slow on purpose
+    rng = random.Random(args.seed)
+    urls = [f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'plans.db')}"]
+    if args.database_url:
+        urls.append(args.database_url)
+    failures = sum(check_database(url, args.notes, rng, args.verbose) for url in urls)
+    if failures:
+        sys.exit(f'\nFAIL: {failures} statement(s) sort a full table scan')
+    print('\nOK')
+
+
+if __name__ == '__main__':
+    main()
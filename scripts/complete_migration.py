@@ -10,12 +10,10 @@ Step 5: Deploy to Vercel
 
 import os
 import sys
-import sqlite3
-from datetime import datetime
 from dotenv import load_dotenv
 
 # Add the parent directory to the path
-sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 load_dotenv()
 
@@ -53,8 +51,7 @@ def step2_create_tables():
     print("-" * 50)
     
     try:
-        from src.models.user import db, User
-        from src.models.note import Note
+        from src.models.user import db
         from flask import Flask
         
         app = Flask(__name__)
@@ -65,8 +62,9 @@ def step2_create_tables():
         db.init_app(app)
         
         with app.app_context():
-            # Create all tables
-            db.create_all()
+            # Apply the versioned schema migrations
+            from src.migrations import migrate
+            migrate(db.engine)
             print("✅ Tables created successfully!")
             
             # Verify tables exist
@@ -88,76 +86,17 @@ def step3_migrate_data():
     print("\n📦 Step 3: Migrating Data from SQLite")
     print("-" * 50)
     
-    sqlite_path = os.path.join(os.path.dirname(__file__), '..', 'database', 'app.db')
+    from scripts.sqlite_to_postgres import DEFAULT_SQLITE_PATH, migrate_sqlite_to_postgres
     
-    if not os.path.exists(sqlite_path):
+    if not os.path.exists(DEFAULT_SQLITE_PATH):
         print("ℹ️  No SQLite database found. Skipping data migration.")
         return True
     
     try:
-        from src.models.user import db, User
-        from src.models.note import Note
-        from flask import Flask
-        
-        # Setup Flask app
-        app = Flask(__name__)
-        app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL')
-        app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-        app.config['SECRET_KEY'] = 'migration-key'
-        
-        db.init_app(app)
-        
-        # Connect to SQLite
-        sqlite_conn = sqlite3.connect(sqlite_path)
-        sqlite_cursor = sqlite_conn.cursor()
-        
-        with app.app_context():
-            # Migrate notes
-            sqlite_cursor.execute("SELECT * FROM note")
-            notes_data = sqlite_cursor.fetchall()
-            
-            sqlite_cursor.execute("PRAGMA table_info(note)")
-            columns = [col[1] for col in sqlite_cursor.fetchall()]
-            
-            migrated_notes = 0
-            for row in notes_data:
-                note_dict = dict(zip(columns, row))
-                
-                # Handle datetime fields
-                created_at = datetime.utcnow()
-                updated_at = datetime.utcnow()
-                
-                if note_dict.get('created_at'):
-                    try:
-                        created_at = datetime.fromisoformat(note_dict['created_at'].replace('Z', '+00:00'))
-                    except:
-                        pass
-                
-                if note_dict.get('updated_at'):
-                    try:
-                        updated_at = datetime.fromisoformat(note_dict['updated_at'].replace('Z', '+00:00'))
-                    except:
-                        pass
-                
-                # Create new note
-                note = Note(
-                    title=note_dict.get('title', 'Untitled'),
-                    content=note_dict.get('content', ''),
-                    tags=note_dict.get('tags'),
-                    position=note_dict.get('position'),
-                    event_date=None,  # Handle date parsing if needed
-                    event_time=None,  # Handle time parsing if needed
-                    created_at=created_at,
-                    updated_at=updated_at
-                )
-                
-                db.session.add(note)
-                migrated_notes += 1
-            
-            db.session.commit()
-            print(f"✅ Migrated {migrated_notes} notes successfully!")
-        
-        sqlite_conn.close()
+        # bulk COPY in chunks; running the step again resumes from the last committed chunk
+        copied = migrate_sqlite_to_postgres(DEFAULT_SQLITE_PATH, os.environ.get('DATABASE_URL'),
+                                            migrate_schema=False)
+        print(f"✅ Migrated {copied.get('notes', 0)} notes successfully!")
         return True
         
     except Exception as e:
@@ -170,7 +109,7 @@ def step4_test_application():
     print("-" * 50)
     
     try:
-        from src.models.user import db, User
+        from src.models.user import db
         from src.models.note import Note
         from flask import Flask
         
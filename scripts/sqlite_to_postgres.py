@@ -0,0 +1,311 @@
+"""Copy the data of a SQLite database into PostgreSQL in bulk.
+
+The SQLite tables are read in chunks (keyset on rowid, so memory stays flat for any size) and each chunk is loaded
+with COPY ... FROM STDIN, falling back to multi-row INSERTs (psycopg2.extras.execute_values) where COPY is not
+allowed. Tables without foreign keys between them are loaded in parallel, one connection each.
+
+Every chunk is committed together with a checkpoint row in sqlite_import_checkpoints, so an interrupted run picks
+up where it stopped when started again. The checkpoint table is dropped once everything has been copied.
+
+The schema is created first by applying the versioned migrations (src/migrations). Ids are kept and the id
+sequences are moved past the copied rows. Both the current table names (notes, users) and the ones of older
+databases (note, user) are read; background jobs are not copied.
+
+Usage:
+    python scripts/sqlite_to_postgres.py [--sqlite database/app.db] [--database-url postgresql://...]
+                                         [--chunk-size 5000] [--workers 3] [--method copy|insert] [--truncate]
+"""
+import argparse
+import io
+import os
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the parent directory to the path so we can import our models
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+DEFAULT_SQLITE_PATH = os.path.join(ROOT_DIR, 'database', 'app.db')
+CHUNK_SIZE = 5000
+CHECKPOINT_TABLE = 'sqlite_import_checkpoints'
+PROGRESS_EVERY = 20  # chunks between progress lines
+
+# (target table, source tables to try in order, stage). Tables of one stage are loaded in parallel; a stage only
+# starts when the previous one is done, so rows referenced by foreign keys are always there first.
+TABLES = [
+    ('users', ('users', 'user'), 0),
+    ('notes', ('notes', 'note'), 0),
+    ('note_tombstones', ('note_tombstones',), 0),
+    ('note_tags', ('note_tags',), 1),
+]
+
+# rebuilds note_tags from notes.tags when the SQLite database predates the note_tags table
+BACKFILL_NOTE_TAGS_SQL = """
+    INSERT INTO note_tags (note_id, tag)
+    SELECT DISTINCT n.id, left(trim(t.tag), 100)
+    FROM notes n, unnest(string_to_array(n.tags, ',')) AS t(tag)
+    WHERE trim(t.tag) <> ''
+    ON CONFLICT DO NOTHING
+"""
+
+_print_lock = threading.Lock()
+
+
+def _log(message):
+    with _print_lock:
+        print(message, flush=True)
+
+
+def _pg_dsn(database_url):
+    """libpq DSN from a SQLAlchemy style URL: postgres:// and any +driver suffix become postgresql://"""
+    scheme, sep, rest = database_url.partition('://')
+    if sep and scheme.split('+', 1)[0] in ('postgres', 'postgresql'):
+        return 'postgresql://' + rest
+    return database_url
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _copy_value(value):
+    """A value in COPY text format"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bytes):
+        return '\\\\x' + value.hex()
+    return (str(value).replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+
+class TableCopy:
+    """Copies one SQLite table into its PostgreSQL counterpart, chunk by chunk"""
+
+    def __init__(self, sqlite_path, dsn, target, source, columns, limits, chunk_size, method):
+        self.sqlite_path = sqlite_path
+        self.dsn = dsn
+        self.target = target
+        self.source = source
+        self.columns = columns
+        self.limits = limits  # column index -> varchar length, values are cut to fit
+        self.chunk_size = chunk_size
+        self.method = method
+        self.rows = 0
+
+    def run(self, start_rowid, done_rows):
+        import psycopg2
+        source = sqlite3.connect(f'file:{self.sqlite_path}?mode=ro', uri=True)
+        pg = psycopg2.connect(self.dsn)
+        started = time.perf_counter()
+        self.rows = done_rows
+        column_sql = ', '.join(_quote(c) for c in self.columns)
+        read_sql = (f'SELECT rowid, {column_sql} FROM {_quote(self.source)} '
+                    f'WHERE rowid > ? ORDER BY rowid LIMIT {self.chunk_size}')
+        last_rowid = start_rowid
+        chunks = 0
+        try:
+            with pg.cursor() as cur:
+                cur.execute("SET TIME ZONE 'UTC'")  # SQLite stores naive UTC timestamps
+            pg.commit()
+            while True:
+                chunk = source.execute(read_sql, (last_rowid,)).fetchall()
+                if not chunk:
+                    break
+                last_rowid = chunk[-1][0]
+                rows = [self._fit(row[1:]) for row in chunk]
+                self._load(pg, rows)
+                with pg.cursor() as cur:
+                    cur.execute(f"""
+                        INSERT INTO {CHECKPOINT_TABLE} (table_name, source_rowid, rows) VALUES (%s, %s, %s)
+                        ON CONFLICT (table_name) DO UPDATE SET source_rowid = EXCLUDED.source_rowid,
+                                                               rows = EXCLUDED.rows
+                    """, (self.target, last_rowid, self.rows + len(rows)))
+                pg.commit()
+                self.rows += len(rows)
+                chunks += 1
+                if chunks % PROGRESS_EVERY == 0:
+                    self._progress(started, done_rows)
+        finally:
+            pg.close()
+            source.close()
+        seconds = time.perf_counter() - started
+        copied = self.rows - done_rows
+        _log(f"  {self.target:<16} {copied:>10} rows in {seconds:7.2f}s "
+             f"({copied / seconds if seconds else 0:,.0f} rows/s, {self.method})")
+        return copied, seconds
+
+    def _fit(self, row):
+        if not self.limits:
+            return row
+        row = list(row)
+        for i, length in self.limits.items():
+            if isinstance(row[i], str) and len(row[i]) > length:
+                row[i] = row[i][:length]
+        return row
+
+    def _load(self, pg, rows):
+        import psycopg2
+        if self.method == 'copy':
+            buffer = io.StringIO(''.join('\t'.join(_copy_value(v) for v in row) + '\n' for row in rows))
+            try:
+                with pg.cursor() as cur:
+                    cur.copy_expert(f'COPY {_quote(self.target)} ({", ".join(_quote(c) for c in self.columns)}) '
+                                    f'FROM STDIN', buffer)
+                return
+            except (psycopg2.errors.FeatureNotSupported, psycopg2.errors.InsufficientPrivilege) as e:
+                pg.rollback()
+                _log(f"  {self.target}: COPY not available ({str(e).strip()}), using INSERT")
+                self.method = 'insert'
+        from psycopg2.extras import execute_values
+        with pg.cursor() as cur:
+            execute_values(cur, f'INSERT INTO {_quote(self.target)} ({", ".join(_quote(c) for c in self.columns)}) '
+                                f'VALUES %s', rows, page_size=1000)
+
+    def _progress(self, started, done_rows):
+        seconds = time.perf_counter() - started
+        _log(f"  {self.target:<16} {self.rows:>10} rows so far "
+             f"({(self.rows - done_rows) / seconds if seconds else 0:,.0f} rows/s)")
+
+
+def _source_table(sqlite_conn, candidates):
+    """The first candidate that exists and has rows (else the first that exists, else None)"""
+    existing = {name for (name,) in sqlite_conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    found = [name for name in candidates if name in existing]
+    for name in found:
+        if sqlite_conn.execute(f'SELECT 1 FROM {_quote(name)} LIMIT 1').fetchone():
+            return name
+    return found[0] if found else None
+
+
+def _target_columns(pg, table):
+    """{column: varchar length or None} of the columns that can be written (not generated)"""
+    with pg.cursor() as cur:
+        cur.execute("""
+            SELECT column_name, character_maximum_length FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = %s AND is_generated = 'NEVER'
+            ORDER BY ordinal_position
+        """, (table,))
+        return dict(cur.fetchall())
+
+
+def migrate_sqlite_to_postgres(sqlite_path, database_url, chunk_size=CHUNK_SIZE, workers=3, method='copy',
+                               truncate=False, migrate_schema=True):
+    """Copy all note app tables from `sqlite_path` into `database_url`. Returns {table: rows copied}."""
+    import psycopg2
+    dsn = _pg_dsn(database_url)
+
+    if migrate_schema:
+        from sqlalchemy import create_engine
+        from src.migrations import migrate
+        engine = create_engine(dsn.replace('postgresql://', 'postgresql+psycopg2://', 1))
+        try:
+            migrate(engine)
+        finally:
+            engine.dispose()
+
+    source = sqlite3.connect(f'file:{sqlite_path}?mode=ro', uri=True)
+    pg = psycopg2.connect(dsn)
+    try:
+        with pg.cursor() as cur:
+            if truncate:
+                targets = ', '.join(_quote(t) for t, _, _ in TABLES)
+                cur.execute(f'TRUNCATE {targets} RESTART IDENTITY CASCADE')
+                cur.execute(f'DROP TABLE IF EXISTS {CHECKPOINT_TABLE}')
+            cur.execute(f"""
+                CREATE TABLE IF NOT EXISTS {CHECKPOINT_TABLE} (
+                    table_name TEXT PRIMARY KEY, source_rowid BIGINT NOT NULL, rows BIGINT NOT NULL
+                )
+            """)
+            cur.execute(f'SELECT table_name, source_rowid, rows FROM {CHECKPOINT_TABLE}')
+            checkpoints = {name: (rowid, rows) for name, rowid, rows in cur.fetchall()}
+        pg.commit()
+
+        stages = {}
+        for target, candidates, stage in TABLES:
+            name = _source_table(source, candidates)
+            if name is None:
+                continue
+            target_columns = _target_columns(pg, target)
+            source_columns = [row[1] for row in source.execute(f'PRAGMA table_info({_quote(name)})')]
+            columns = [c for c in source_columns if c in target_columns]
+            limits = {i: target_columns[c] for i, c in enumerate(columns) if target_columns[c]}
+            if target not in checkpoints:
+                with pg.cursor() as cur:
+                    cur.execute(f'SELECT 1 FROM {_quote(target)} LIMIT 1')
+                    if cur.fetchone():
+                        raise RuntimeError(f'Table {target} already has rows and there is no checkpoint to resume '
+                                           f'from; run with --truncate to replace its contents')
+            copy = TableCopy(sqlite_path, dsn, target, name, columns, limits, chunk_size, method)
+            stages.setdefault(stage, []).append((copy, checkpoints.get(target, (0, 0))))
+        pg.commit()
+
+        started = time.perf_counter()
+        copied = {}
+        for stage in sorted(stages):
+            jobs = stages[stage]
+            with ThreadPoolExecutor(max_workers=max(1, min(workers, len(jobs)))) as pool:
+                futures = {copy.target: pool.submit(copy.run, *checkpoint) for copy, checkpoint in jobs}
+                for target, future in futures.items():
+                    copied[target] = future.result()[0]
+        seconds = time.perf_counter() - started
+
+        with pg.cursor() as cur:
+            if not any(copy.target == 'note_tags' and copy.rows for jobs in stages.values() for copy, _ in jobs):
+                cur.execute(BACKFILL_NOTE_TAGS_SQL)
+                copied['note_tags'] = copied.get('note_tags', 0) + cur.rowcount
+                _log(f"  note_tags        {cur.rowcount:>10} rows rebuilt from notes.tags")
+            for table in ('users', 'notes'):
+                cur.execute(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                            f"COALESCE(MAX(id), 1), MAX(id) IS NOT NULL) FROM {_quote(table)}")
+            # the sync cursor must not run behind the copied change numbers
+            cur.execute("UPDATE sync_state SET change_seq = GREATEST(change_seq, "
+                        "(SELECT COALESCE(MAX(change_seq), 0) FROM notes), "
+                        "(SELECT COALESCE(MAX(change_seq), 0) FROM note_tombstones)) WHERE id = 1")
+            cur.execute(f'DROP TABLE {CHECKPOINT_TABLE}')
+        pg.commit()
+        # fresh planner statistics for the bulk-loaded tables (ANALYZE cannot run inside a transaction block)
+        pg.autocommit = True
+        with pg.cursor() as cur:
+            for target, _, _ in TABLES:
+                cur.execute(f'ANALYZE {_quote(target)}')
+    finally:
+        pg.close()
+        source.close()
+
+    total = sum(copied.values())
+    _log(f"Copied {total} rows in {seconds:.2f}s ({total / seconds if seconds else 0:,.0f} rows/s)")
+    return copied
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Copy a SQLite notes database into PostgreSQL')
+    parser.add_argument('--sqlite', default=DEFAULT_SQLITE_PATH, help='SQLite database file')
+    parser.add_argument('--database-url', default=os.getenv('DATABASE_URL'), help='PostgreSQL URL (DATABASE_URL)')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='rows per chunk and commit')
+    parser.add_argument('--workers', type=int, default=3, help='tables loaded in parallel')
+    parser.add_argument('--method', choices=['copy', 'insert'], default='copy')
+    parser.add_argument('--truncate', action='store_true', help='empty the PostgreSQL tables first')
+    parser.add_argument('--no-migrate', action='store_true', help='do not apply schema migrations first')
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+    load_dotenv()
+    database_url = args.database_url or os.getenv('DATABASE_URL')
+    if not database_url or not database_url.startswith(('postgres://', 'postgresql')):
+        sys.exit('A PostgreSQL --database-url (or DATABASE_URL) is required')
+    if not os.path.exists(args.sqlite):
+        sys.exit(f'SQLite database not found: {args.sqlite}')
+
+    print(f"Copying {args.sqlite} into PostgreSQL")
+    try:
+        migrate_sqlite_to_postgres(args.sqlite, database_url, chunk_size=args.chunk_size, workers=args.workers,
+                                   method=args.method, truncate=args.truncate, migrate_schema=not args.no_migrate)
+    except RuntimeError as e:
+        sys.exit(str(e))
+
+
+if __name__ == '__main__':
+    main()
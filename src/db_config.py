@@ -0,0 +1,247 @@
+"""SQLAlchemy engine settings for the configured database.
+
+SQLite (local and self-hosted mode) gets a performance profile, applied to every new connection:
+  journal_mode=WAL      readers and the writer no longer block each other (persistent, stored in the file)
+  synchronous=NORMAL    no fsync per commit in WAL mode, only at checkpoints; a power cut can lose the last
+                        commits but not corrupt the database
+  busy_timeout          a writer waits this long for the write lock instead of failing with "database is locked"
+  cache_size, mmap_size larger page cache per connection, and reads through a memory map instead of read() calls
+  temp_store=MEMORY     sorts and temporary indexes stay in memory
+
+Configured from the environment:
+  SQLITE_TUNING           set to false to keep SQLite's defaults (rollback journal, synchronous=FULL)
+  SQLITE_BUSY_TIMEOUT_MS  default 5000
+  SQLITE_CACHE_SIZE_KB    page cache per connection, default 16384
+  SQLITE_MMAP_SIZE_MB     default 256 (0 = off)
+  SQLITE_POOL_SIZE        pooled connections, default 5; with WAL they can all read while one of them writes
+WAL needs a local filesystem (not NFS/SMB) and adds app.db-wal and app.db-shm files next to the database.
+
+PostgreSQL gets its pool from a preset (DB_POOL_PRESET), each setting of which can be overridden:
+  server      long-running processes (gunicorn, flask run): a pool of 5 (+10 overflow) connections per process,
+              used last-in first-out so surplus connections go idle and get recycled; no pre-ping round trip
+  serverless  one connection per request, closed afterwards (NullPool). Frozen or scaled-out function instances
+              then hold no connections; pair it with a pooler such as Supabase's Supavisor or pgbouncer
+The default is serverless on Vercel / AWS Lambda and server elsewhere.
+  DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING  override the preset
+  DB_QUERY_CACHE_SIZE   SQLAlchemy's compiled statement cache per engine (default 500)
+  DB_PGBOUNCER          set when DATABASE_URL goes through a transaction-mode pooler (pgbouncer, Supavisor on port
+                        6543): server-side prepared statements are turned off (psycopg 3; psycopg2 never uses them)
+                        and migrations skip their session-level advisory lock
+
+Every pool counts checkouts, time spent waiting for a connection, timeouts and new connections (pool_families(),
+rendered by GET /api/metrics).
+"""
+import os
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import NullPool, QueuePool
+
+
+def _env_flag(name, default):
+    return os.getenv(name, default).lower() in ('1', 'true', 'yes')
+
+
+SQLITE_TUNING = _env_flag('SQLITE_TUNING', 'true')
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+SQLITE_CACHE_SIZE_KB = int(os.getenv('SQLITE_CACHE_SIZE_KB', '16384'))
+SQLITE_MMAP_SIZE_MB = int(os.getenv('SQLITE_MMAP_SIZE_MB', '256'))
+SQLITE_POOL_SIZE = int(os.getenv('SQLITE_POOL_SIZE', '5'))
+
+POOL_PRESETS = {
+    'server': {
+        'pool_size': 5,
+        'max_overflow': 10,
+        'pool_timeout': 30,
+        # below the idle timeouts of managed PostgreSQL and poolers, so connections are replaced before being cut
+        'pool_recycle': 300,
+        'pool_pre_ping': False,
+        'pool_use_lifo': True,
+    },
+    'serverless': {
+        'poolclass': NullPool,
+    },
+}
+_SERVERLESS = bool(os.getenv('VERCEL') or os.getenv('AWS_LAMBDA_FUNCTION_NAME'))
+DB_POOL_PRESET = os.getenv('DB_POOL_PRESET', 'serverless' if _SERVERLESS else 'server')
+DB_PGBOUNCER = _env_flag('DB_PGBOUNCER', 'false')
+# env var -> (engine option, type); options a NullPool does not take are skipped for it
+POOL_OVERRIDES = {
+    'DB_POOL_SIZE': ('pool_size', int),
+    'DB_MAX_OVERFLOW': ('max_overflow', int),
+    'DB_POOL_TIMEOUT': ('pool_timeout', int),  # whole seconds: engine_from_config coerces it to int
+    'DB_POOL_RECYCLE': ('pool_recycle', int),
+    'DB_POOL_PRE_PING': ('pool_pre_ping', lambda v: v.lower() in ('1', 'true', 'yes')),
+    'DB_QUERY_CACHE_SIZE': ('query_cache_size', int),
+}
+NULL_POOL_OPTIONS = ('pool_pre_ping', 'query_cache_size')
+
+
+def sqlite_pragmas():
+    """PRAGMA name -> value run on each new SQLite connection"""
+    return {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': SQLITE_BUSY_TIMEOUT_MS,
+        'cache_size': -SQLITE_CACHE_SIZE_KB,  # negative: size in KiB rather than pages
+        'mmap_size': SQLITE_MMAP_SIZE_MB * 1024 * 1024,
+        'temp_store': 'MEMORY',
+    }
+
+
+def engine_options(database_uri):
+    """SQLALCHEMY_ENGINE_OPTIONS for `database_uri`"""
+    if database_uri.startswith('sqlite'):
+        return _sqlite_options(database_uri)
+    if DB_POOL_PRESET not in POOL_PRESETS:
+        raise ValueError(f"DB_POOL_PRESET must be one of {', '.join(POOL_PRESETS)}, not {DB_POOL_PRESET!r}")
+    options = dict(POOL_PRESETS[DB_POOL_PRESET])
+    for name, (option, convert) in POOL_OVERRIDES.items():
+        if os.getenv(name):
+            options[option] = convert(os.getenv(name))
+    if options.get('poolclass') is NullPool:
+        options = {k: v for k, v in options.items() if k == 'poolclass' or k in NULL_POOL_OPTIONS}
+        options['poolclass'] = TimedNullPool
+    else:
+        options['poolclass'] = TimedQueuePool
+    if DB_PGBOUNCER and database_uri.startswith('postgresql+psycopg://'):
+        # a transaction pooler hands each transaction to any server connection, where a prepared statement is unknown
+        options['connect_args'] = {'prepare_threshold': None}
+    return options
+
+
+def _sqlite_options(database_uri):
+    if database_uri in ('sqlite://', 'sqlite:///:memory:'):
+        return {}
+    if not SQLITE_TUNING:
+        return {'poolclass': TimedQueuePool}
+    return {
+        'poolclass': TimedQueuePool,
+        # a local file: connections do not go stale, so no pre-ping round trip or recycling
+        'pool_size': SQLITE_POOL_SIZE,
+        'max_overflow': SQLITE_POOL_SIZE * 2,
+        # waiting for the lock happens in SQLite (busy_timeout); the driver's own timeout is in seconds
+        'connect_args': {'timeout': SQLITE_BUSY_TIMEOUT_MS / 1000},
+    }
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record=None):
+    """'connect' event listener applying sqlite_pragmas()"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in sqlite_pragmas().items():
+            cursor.execute(f'PRAGMA {name}={value}')
+    finally:
+        cursor.close()
+
+
+class PoolStats:
+    """Counters of one engine's connection pool"""
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkins = 0
+        self.wait_seconds = 0.0
+        self.timeouts = 0
+        self.connects = 0
+        self.connect_seconds = 0.0
+
+    def observe_checkout(self, seconds):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_seconds += seconds
+
+    def observe_checkin(self):
+        with self._lock:
+            self.checkins += 1
+
+    def observe_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def observe_connect(self, seconds):
+        with self._lock:
+            self.connects += 1
+            self.connect_seconds += seconds
+
+
+_pool_stats = {}  # engine name -> PoolStats
+
+
+class _TimedPool:
+    """Pool mixin feeding PoolStats through the pool's _do_get / _do_return_conn / _create_connection hooks"""
+    stats = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except PoolTimeoutError:
+            if self.stats:
+                self.stats.observe_timeout()
+            raise
+        if self.stats:
+            self.stats.observe_checkout(time.perf_counter() - started)
+        return record
+
+    def _do_return_conn(self, record):
+        if self.stats:
+            self.stats.observe_checkin()
+        super()._do_return_conn(record)
+
+    def _create_connection(self):
+        started = time.perf_counter()
+        record = super()._create_connection()
+        if self.stats:
+            self.stats.observe_connect(time.perf_counter() - started)
+        return record
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+class TimedQueuePool(_TimedPool, QueuePool):
+    pass
+
+
+class TimedNullPool(_TimedPool, NullPool):
+    pass
+
+
+def init_engine(engine, name='primary'):
+    """Install the SQLite profile (unless SQLITE_TUNING is off) and pool counters on `engine`"""
+    if engine.dialect.name == 'sqlite' and SQLITE_TUNING:
+        event.listen(engine, 'connect', set_sqlite_pragmas)
+    if isinstance(engine.pool, _TimedPool):
+        engine.pool.stats = _pool_stats.setdefault(name, PoolStats(name))
+
+
+def init_app(app, db):
+    """Call after db.init_app(app); the engine exists by then but has not connected yet"""
+    with app.app_context():
+        init_engine(db.engine)
+
+
+def pool_families():
+    """Pool metrics as (name, type, help, samples) families for instrumentation.Metrics.render()"""
+    stats = list(_pool_stats.values())
+
+    def samples(attr):
+        return [({'pool': s.name}, getattr(s, attr)) for s in stats]
+
+    return [
+        ('db_pool_checkouts_total', 'counter', 'Connections checked out of the pool', samples('checkouts')),
+        ('db_pool_checkout_wait_seconds_total', 'counter',
+         'Time spent getting a connection from the pool, including connecting', samples('wait_seconds')),
+        ('db_pool_checkout_timeouts_total', 'counter', 'Checkouts that gave up after pool_timeout', samples('timeouts')),
+        ('db_pool_connections_opened_total', 'counter', 'New database connections opened', samples('connects')),
+        ('db_pool_connect_seconds_total', 'counter', 'Time spent opening database connections',
+         samples('connect_seconds')),
+        ('db_pool_in_use', 'gauge', 'Connections currently checked out',
+         [({'pool': s.name}, s.checkouts - s.checkins) for s in stats]),
+    ]
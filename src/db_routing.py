@@ -0,0 +1,158 @@
+"""Read-replica routing for the database session.
+
+With DATABASE_READ_URLS set (comma separated), the SELECTs of views marked @read_replica go to one of the replicas,
+round-robin; everything else uses the primary (DATABASE_URL):
+  - writes (ORM flushes, INSERT/UPDATE/DELETE, raw SQL text), and any query later in the same session
+  - requests from a client that wrote within the last READ_YOUR_WRITES_SECONDS. Successful write requests set a
+    short-lived cookie, so the client's next reads see its own changes instead of a lagging replica
+  - all views without @read_replica (sync feed, jobs, ...), CLI commands and background jobs
+A request sticks to the replica it started on, so its queries see one consistent snapshot.
+
+Replicas are health-checked with SELECT 1 when picked, at most every REPLICA_CHECK_SECONDS, and right after one of
+their connections drops; a replica that fails the check is skipped for REPLICA_RETRY_SECONDS. With no healthy
+replica, reads go to the primary.
+
+Configured from the environment:
+  DATABASE_READ_URLS         replica URLs (default: none, everything on the primary)
+  READ_YOUR_WRITES_SECONDS   default 10
+  REPLICA_CHECK_SECONDS      default 30
+  REPLICA_RETRY_SECONDS      default 15
+"""
+import functools
+import itertools
+import logging
+import os
+import threading
+import time
+from flask import current_app, g, has_app_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, text
+from sqlalchemy.sql import Select, CompoundSelect
+
+READ_YOUR_WRITES_SECONDS = int(os.getenv('READ_YOUR_WRITES_SECONDS', '10'))
+REPLICA_CHECK_SECONDS = float(os.getenv('REPLICA_CHECK_SECONDS', '30'))
+REPLICA_RETRY_SECONDS = float(os.getenv('REPLICA_RETRY_SECONDS', '15'))
+# cookie marking a client that wrote recently
+PRIMARY_COOKIE = 'read_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+logger = logging.getLogger('notes.db_routing')
+
+
+class Replica:
+    __slots__ = ('name', 'engine', 'healthy', 'checked_at', 'reads')
+
+    def __init__(self, name, engine):
+        self.name = name
+        self.engine = engine
+        self.healthy = True
+        self.checked_at = 0.0
+        self.reads = 0
+
+
+class ReplicaSet:
+    """Round-robin over the healthy replicas"""
+
+    def __init__(self, engines):
+        self.replicas = [Replica(f'replica{i}', engine) for i, engine in enumerate(engines)]
+        self._cycle = itertools.cycle(self.replicas)
+        self._lock = threading.Lock()
+        self.primary_fallbacks = 0
+        for replica in self.replicas:
+            event.listen(replica.engine, 'handle_error', functools.partial(self._on_error, replica))
+
+    def pick(self):
+        """The next healthy replica, or None (read from the primary)"""
+        now = time.monotonic()
+        for _ in range(len(self.replicas)):
+            with self._lock:
+                replica = next(self._cycle)
+            interval = REPLICA_CHECK_SECONDS if replica.healthy else REPLICA_RETRY_SECONDS
+            if now - replica.checked_at >= interval:
+                self._check(replica, now)
+            if replica.healthy:
+                with self._lock:
+                    replica.reads += 1
+                return replica
+        with self._lock:
+            self.primary_fallbacks += 1
+        return None
+
+    def _check(self, replica, now):
+        replica.checked_at = now
+        try:
+            with replica.engine.connect() as conn:
+                conn.execute(text('SELECT 1'))
+        except Exception as e:
+            if replica.healthy:
+                logger.warning(f'Read replica {replica.name} is down: {str(e).splitlines()[0]}')
+            replica.healthy = False
+        else:
+            if not replica.healthy:
+                logger.warning(f'Read replica {replica.name} is back')
+            replica.healthy = True
+
+    def _on_error(self, replica, context):
+        if context.is_disconnect:
+            replica.checked_at = 0.0  # health-check it again before the next read
+
+    def stats(self):
+        return [(r.name, r.healthy, r.reads) for r in self.replicas]
+
+
+class RoutingSession(Session):
+    """Session that sends the SELECTs of @read_replica views to a replica (see module docstring)"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            if self._flushing or (clause is not None and not isinstance(clause, (Select, CompoundSelect))):
+                # may write: the rest of the session reads its own changes from the primary
+                self.info['primary'] = True
+            elif clause is not None:
+                replica = self._read_replica()
+                if replica is not None:
+                    return replica.engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _read_replica(self):
+        if self.info.get('primary') or not has_app_context() or not g.get('use_read_replica'):
+            return None
+        replicas = current_app.extensions.get('read_replicas')
+        if replicas is None:
+            return None
+        if 'replica' not in self.info:
+            self.info['replica'] = replicas.pick()
+        return self.info['replica']
+
+
+def read_replica(view):
+    """Mark a read-only view whose queries may be answered by a read replica"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        g.use_read_replica = not request.cookies.get(PRIMARY_COOKIE)
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def init_app(app):
+    """Create the replica engines from DATABASE_READ_URLS (if any) and the read-your-writes cookie hook"""
+    urls = [u.strip() for u in os.getenv('DATABASE_READ_URLS', '').split(',') if u.strip()]
+    if not urls:
+        return
+    from sqlalchemy import create_engine
+    from src import db_config
+    engines = []
+    for i, url in enumerate(urls):
+        if url.startswith('postgres://'):
+            url = url.replace('postgres://', 'postgresql://', 1)
+        engine = create_engine(url, **db_config.engine_options(url))
+        db_config.init_engine(engine, name=f'replica{i}')
+        engines.append(engine)
+    app.extensions['read_replicas'] = ReplicaSet(engines)
+
+    @app.after_request
+    def _mark_writer(response):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            response.set_cookie(PRIMARY_COOKIE, '1', max_age=READ_YOUR_WRITES_SECONDS, httponly=True,
+                                samesite='Lax')
+        return response
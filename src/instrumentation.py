@@ -0,0 +1,193 @@
+"""Per-request timing, SQL query counting and process-wide metrics.
+
+For each request this records the wall time, the time and number of SQL statements (SQLAlchemy cursor events) and
+the time spent waiting on the LLM (reported by src/llm.py through record_llm_call()). The numbers are sent back in a
+Server-Timing header, requests slower than SLOW_REQUEST_MS are logged as one JSON line, and totals are kept for
+GET /api/metrics (Prometheus text format).
+
+Configured from the environment:
+  SLOW_REQUEST_MS  log requests that take at least this long (default 500, 0 = off)
+  SLOW_QUERY_MS    log single SQL statements that take at least this long (default 200, 0 = off)
+For streamed responses (server-sent events, export) only the work done before the first byte is counted.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+SLOW_REQUEST_MS = float(os.getenv('SLOW_REQUEST_MS', '500'))
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', '200'))
+# upper bounds (seconds) of the request duration histogram
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+logger = logging.getLogger('notes.instrumentation')
+
+
+class RequestStats:
+    __slots__ = ('db_time', 'db_queries', 'llm_time', 'llm_calls')
+
+    def __init__(self):
+        self.db_time = 0.0
+        self.db_queries = 0
+        self.llm_time = 0.0
+        self.llm_calls = 0
+
+
+# stats of the request being handled by this thread / context (None outside requests, e.g. in background jobs)
+_current = ContextVar('request_stats', default=None)
+
+
+class Metrics:
+    """Process-wide counters, rendered in Prometheus text format"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = {}   # (method, endpoint, status) -> count
+        self.durations = {}  # (method, endpoint) -> [bucket counts..., sum, count]
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.slow_queries = 0
+        self.llm_calls = 0
+        self.llm_seconds = 0.0
+        self.slow_requests = 0
+
+    def observe_request(self, method, endpoint, status, seconds, slow):
+        with self._lock:
+            self.slow_requests += slow
+            key = (method, endpoint, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            hist = self.durations.setdefault((method, endpoint), [0] * len(DURATION_BUCKETS) + [0.0, 0])
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if seconds <= bound:
+                    hist[i] += 1
+            hist[-2] += seconds
+            hist[-1] += 1
+
+    def observe_query(self, seconds, slow):
+        with self._lock:
+            self.db_queries += 1
+            self.db_seconds += seconds
+            self.slow_queries += slow
+
+    def observe_llm(self, seconds):
+        with self._lock:
+            self.llm_calls += 1
+            self.llm_seconds += seconds
+
+    def render(self, extra=()):
+        """Prometheus exposition text; `extra` is a list of (name, type, help, [(labels dict, value)])"""
+        with self._lock:
+            families = [
+                ('http_requests_total', 'counter', 'HTTP requests handled',
+                 [({'method': m, 'endpoint': e, 'status': str(s)}, n) for (m, e, s), n in sorted(self.requests.items())]),
+                ('http_slow_requests_total', 'counter', 'Requests slower than SLOW_REQUEST_MS', [({}, self.slow_requests)]),
+                ('db_queries_total', 'counter', 'SQL statements executed', [({}, self.db_queries)]),
+                ('db_query_seconds_total', 'counter', 'Time spent in SQL statements', [({}, self.db_seconds)]),
+                ('db_slow_queries_total', 'counter', 'SQL statements slower than SLOW_QUERY_MS', [({}, self.slow_queries)]),
+                ('llm_calls_total', 'counter', 'LLM requests made', [({}, self.llm_calls)]),
+                ('llm_call_seconds_total', 'counter', 'Time spent waiting on the LLM', [({}, self.llm_seconds)]),
+            ]
+            lines = []
+            for name, kind, help_text, samples in families + list(extra):
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+                lines.extend(f'{name}{_labels(labels)} {value}' for labels, value in samples)
+            name = 'http_request_duration_seconds'
+            lines.append(f'# HELP {name} HTTP request duration')
+            lines.append(f'# TYPE {name} histogram')
+            for (method, endpoint), hist in sorted(self.durations.items()):
+                labels = {'method': method, 'endpoint': endpoint}
+                for bound, count in zip(DURATION_BUCKETS, hist):
+                    lines.append(f'{name}_bucket{_labels(dict(labels, le=str(bound)))} {count}')
+                lines.append(f'{name}_bucket{_labels(dict(labels, le="+Inf"))} {hist[-1]}')
+                lines.append(f'{name}_sum{_labels(labels)} {hist[-2]}')
+                lines.append(f'{name}_count{_labels(labels)} {hist[-1]}')
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for v in labels.values())
+    return '{' + ','.join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + '}'
+
+
+metrics = Metrics()
+
+
+def record_llm_call(seconds):
+    """Called by src/llm.py after each model request"""
+    metrics.observe_llm(seconds)
+    stats = _current.get()
+    if stats is not None:
+        stats.llm_time += seconds
+        stats.llm_calls += 1
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # kept on the per-statement execution context: a statement that raises never reaches after_cursor_execute,
+    # and its start time is discarded with the context instead of being left behind on the connection
+    if context is not None:
+        context._query_start = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_query_start', None)
+    if started is None:
+        return
+    seconds = time.perf_counter() - started
+    slow = bool(SLOW_QUERY_MS) and seconds * 1000 >= SLOW_QUERY_MS
+    metrics.observe_query(seconds, slow)
+    stats = _current.get()
+    if stats is not None:
+        stats.db_time += seconds
+        stats.db_queries += 1
+    if slow:
+        logger.warning(json.dumps({'event': 'slow_query', 'ms': round(seconds * 1000, 2),
+                                   'statement': ' '.join(statement.split())[:500]}))
+
+
+def init_app(app):
+    """Install the before/after request hooks on the Flask app"""
+    if not logger.handlers and not logging.getLogger().handlers:
+        logger.addHandler(logging.StreamHandler())
+        logger.setLevel(logging.INFO)
+
+    @app.before_request
+    def _start_timer():
+        g.request_started = time.perf_counter()
+        g.request_stats = RequestStats()
+        _current.set(g.request_stats)
+
+    @app.after_request
+    def _add_timing(response):
+        started = g.pop('request_started', None)
+        if started is None:
+            return response
+        seconds = time.perf_counter() - started
+        stats = g.request_stats
+        _current.set(None)
+
+        response.headers['Server-Timing'] = ', '.join([
+            f'app;dur={seconds * 1000:.2f}',
+            f'db;dur={stats.db_time * 1000:.2f};desc="{stats.db_queries} queries"',
+            f'llm;dur={stats.llm_time * 1000:.2f};desc="{stats.llm_calls} calls"',
+        ])
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        slow = bool(SLOW_REQUEST_MS) and seconds * 1000 >= SLOW_REQUEST_MS
+        metrics.observe_request(request.method, endpoint, response.status_code, seconds, slow)
+        if slow:
+            logger.warning(json.dumps({
+                'event': 'slow_request', 'method': request.method, 'path': request.full_path.rstrip('?'),
+                'endpoint': endpoint, 'status': response.status_code, 'ms': round(seconds * 1000, 2),
+                'db_ms': round(stats.db_time * 1000, 2), 'db_queries': stats.db_queries,
+                'llm_ms': round(stats.llm_time * 1000, 2), 'llm_calls': stats.llm_calls,
+            }))
+        return response
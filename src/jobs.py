@@ -0,0 +1,148 @@
+"""In-process background jobs for slow LLM work.
+
+Request handlers call submit_job() and return 202 right away; a thread pool runs the registered handler
+and stores its result (or error) on the Job row, which clients poll through GET /api/jobs/<id>.
+Jobs interrupted by the previous process are resumed on the first submit or status call (resume_jobs_once()),
+not at startup, so cold starts and CLI commands make no database round trips for them.
+
+A running job records the worker (process) that claimed it, which refreshes heartbeat_at while the handler runs.
+Only jobs whose heartbeat has stopped are re-queued, so a job running in another live process is never run twice.
+
+  JOB_WORKERS            threads running jobs in each process (default 4)
+  JOB_HEARTBEAT_SECONDS  how often a running job's heartbeat is refreshed (default 30)
+  JOB_STALE_SECONDS      a running job without a heartbeat for this long is treated as interrupted (default 300)
+"""
+import json
+import os
+import socket
+import threading
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import update, func
+from src.models.job import Job, db
+
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '4'))
+JOB_HEARTBEAT_SECONDS = int(os.getenv('JOB_HEARTBEAT_SECONDS', '30'))
+JOB_STALE_SECONDS = int(os.getenv('JOB_STALE_SECONDS', '300'))
+# identifies this process in jobs.worker_id
+WORKER_ID = f'{socket.gethostname()[:40]}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+
+_handlers = {}
+_executor = None
+_executor_lock = threading.Lock()
+_resume_lock = threading.Lock()
+
+
+def job_handler(kind):
+    """Register `fn(payload) -> JSON-serializable result` as the handler for jobs of `kind`"""
+    def register(fn):
+        _handlers[kind] = fn
+        return fn
+    return register
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=max(1, JOB_WORKERS), thread_name_prefix='job')
+    return _executor
+
+
+def submit_job(kind, payload):
+    """Persist a queued job and hand it to the worker pool. Returns the Job."""
+    if kind not in _handlers:
+        raise ValueError(f'No handler registered for job kind {kind!r}')
+    resume_jobs_once()
+    job = Job(id=uuid.uuid4().hex, kind=kind, status='queued', payload=json.dumps(payload))
+    db.session.add(job)
+    db.session.commit()
+    _get_executor().submit(_run_job, current_app._get_current_object(), job.id)
+    return job
+
+
+def _run_job(app, job_id):
+    with app.app_context():
+        jobs = Job.__table__
+        # claim the job; another process that resumed it first wins
+        claimed = db.session.execute(
+            update(jobs).where(jobs.c.id == job_id, jobs.c.status == 'queued')
+            .values(status='running', worker_id=WORKER_ID, heartbeat_at=datetime.utcnow())
+        ).rowcount
+        db.session.commit()
+        if not claimed:
+            return
+        kind, payload = db.session.query(Job.kind, Job.payload).filter(Job.id == job_id).one()
+        # don't hold a DB connection while the handler waits on the model
+        db.session.close()
+        stop = threading.Event()
+        threading.Thread(target=_heartbeat, args=(app, job_id, stop), name=f'job-heartbeat-{job_id[:8]}',
+                         daemon=True).start()
+        try:
+            result = _handlers[kind](json.loads(payload))
+        except Exception as e:
+            db.session.rollback()
+            values = {'status': 'failed', 'error': str(e) or e.__class__.__name__}
+            app.logger.warning('Job %s (%s) failed:\n%s', job_id, kind, traceback.format_exc())
+        else:
+            values = {'status': 'succeeded', 'result': json.dumps(result)}
+        finally:
+            stop.set()
+        db.session.execute(update(jobs).where(jobs.c.id == job_id).values(**values))
+        db.session.commit()
+
+
+def _heartbeat(app, job_id, stop):
+    """Refresh heartbeat_at of a running job every JOB_HEARTBEAT_SECONDS until `stop` is set"""
+    jobs = Job.__table__
+    while not stop.wait(JOB_HEARTBEAT_SECONDS):
+        with app.app_context():
+            try:
+                db.session.execute(
+                    update(jobs).where(jobs.c.id == job_id, jobs.c.worker_id == WORKER_ID, jobs.c.status == 'running')
+                    .values(heartbeat_at=datetime.utcnow())
+                )
+                db.session.commit()
+            except Exception as e:
+                # a missed beat is harmless unless the database stays unreachable for JOB_STALE_SECONDS
+                db.session.rollback()
+                app.logger.warning('Job %s heartbeat failed: %s', job_id, str(e).splitlines()[0])
+
+
+def resume_pending_jobs(app):
+    """Re-run jobs left queued, or running without a heartbeat, when the previous process stopped"""
+    with app.app_context():
+        jobs = Job.__table__
+        stale = datetime.utcnow() - timedelta(seconds=JOB_STALE_SECONDS)
+        # jobs claimed before heartbeats existed have no heartbeat_at: fall back to updated_at
+        last_seen = func.coalesce(jobs.c.heartbeat_at, jobs.c.updated_at)
+        db.session.execute(
+            update(jobs).where(jobs.c.status == 'running', last_seen < stale)
+            .values(status='queued', worker_id=None, heartbeat_at=None)
+        )
+        db.session.commit()
+        pending = db.session.query(Job.id).filter(Job.status == 'queued', Job.kind.in_(list(_handlers))).all()
+        for (job_id,) in pending:
+            _get_executor().submit(_run_job, app, job_id)
+        return len(pending)
+
+
+def resume_jobs_once():
+    """Call resume_pending_jobs() for the current app the first time it is needed in this process"""
+    app = current_app._get_current_object()
+    if app.extensions.get('jobs_resumed'):
+        return
+    with _resume_lock:
+        if app.extensions.get('jobs_resumed'):
+            return
+        app.extensions['jobs_resumed'] = True
+        try:
+            resume_pending_jobs(app)
+        except Exception as e:
+            # e.g. the jobs table does not exist until `flask --app src.main migrate` has run
+            db.session.rollback()
+            app.logger.warning('Could not resume pending jobs: %s', str(e).splitlines()[0])
@@ -7,27 +7,278 @@ warnings.filterwarnings(
 )
 # import libraries
 import os
-from openai import OpenAI
+import re
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from openai import OpenAI, DefaultHttpxClient
+import httpx
 from dotenv import load_dotenv
+from src.llm_cache import make_cache, cache_key
+from src.instrumentation import record_llm_call
 
 load_dotenv() # Loads environment variables from .env
-token = os.environ["GITHUB_TOKEN"]
-endpoint = "https://models.github.ai/inference"
-model = "openai/gpt-4.1-mini"
+endpoint = os.getenv("LLM_ENDPOINT", "https://models.github.ai/inference")
+model = os.getenv("LLM_MODEL", "openai/gpt-4.1-mini")
+
+# HTTP settings for the shared client (seconds / connection counts)
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))  # retried with exponential backoff by the SDK
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "10"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))
+# Bulk translation: characters of note text packed into one request, and requests in flight at once
+LLM_BATCH_MAX_CHARS = int(os.getenv("LLM_BATCH_MAX_CHARS", "6000"))
+LLM_BULK_CONCURRENCY = int(os.getenv("LLM_BULK_CONCURRENCY", "4"))
+
+_client = None
+_client_lock = threading.Lock()
+
+# A function to get the process-wide client, so calls reuse pooled keep-alive connections
+def get_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                http_client = DefaultHttpxClient(
+                    limits=httpx.Limits(
+                        max_connections=LLM_MAX_CONNECTIONS,
+                        max_keepalive_connections=LLM_MAX_KEEPALIVE,
+                        keepalive_expiry=LLM_KEEPALIVE_EXPIRY),
+                    timeout=httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT))
+                # the token is read on first use, so the app can start (and serve non-LLM routes) without it
+                _client = OpenAI(base_url=endpoint, api_key=os.environ["GITHUB_TOKEN"], http_client=http_client,
+                                 max_retries=LLM_MAX_RETRIES)
+    return _client
+
 # A function to call an LLM model and return the response
-def call_llm_model(model, messages, temperature=1.0, top_p=1.0): 
-    client = OpenAI(base_url=endpoint,api_key=token)
-    response = client.chat.completions.create(
-        messages=messages,
-        temperature=temperature, top_p=top_p, model=model)
+# (with stream=True, returns a generator of text deltas as the model produces them)
+def call_llm_model(model, messages, temperature=1.0, top_p=1.0, stream=False): 
+    client = get_client()
+    started = time.perf_counter()
+    try:
+        response = client.chat.completions.create(
+            messages=messages,
+            temperature=temperature, top_p=top_p, model=model, stream=stream)
+    except Exception:
+        record_llm_call(time.perf_counter() - started)
+        raise
+    if stream:
+        return _iter_deltas(response, started)
+    record_llm_call(time.perf_counter() - started)
     return response.choices[0].message.content
+
+# (a streamed call is timed until the last delta has been read)
+def _iter_deltas(response, started):
+    try:
+        for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    finally:
+        response.close()
+        record_llm_call(time.perf_counter() - started)
+# Cache for repeated completions (see src/llm_cache.py for the LLM_CACHE_* settings)
+llm_cache = make_cache()
+
+# A function to call the model through the cache; the key covers model, prompt template, text, language and sampling
+def cached_llm_call(template, text, language, messages, temperature=1.0, top_p=1.0):
+    key = cache_key(model, template, text, language, temperature, top_p)
+    result = llm_cache.get(key)
+    if result is None:
+        result = call_llm_model(model, messages, temperature=temperature, top_p=top_p)
+        llm_cache.set(key, result)
+    return result
+
+# Streaming variant of cached_llm_call: a cached answer is yielded in one piece,
+# otherwise deltas are relayed as they arrive and the full text is cached at the end
+def cached_llm_stream(template, text, language, messages, temperature=1.0, top_p=1.0):
+    key = cache_key(model, template, text, language, temperature, top_p)
+    result = llm_cache.get(key)
+    if result is not None:
+        yield result
+        return
+    parts = []
+    for delta in call_llm_model(model, messages, temperature=temperature, top_p=top_p, stream=True):
+        parts.append(delta)
+        yield delta
+    llm_cache.set(key, ''.join(parts))
+
+# A function to report cache hit/miss counters
+def cache_stats():
+    return llm_cache.stats()
+
 # A function to translate to target language using the LLM model
+translate_system_prompt = "You are a helpful assistant that translates text."
+translate_prompt = "Translate the following text to {language}:\n\n{text}"
 def translate_to_language(text, target_language):
     messages = [
-        {"role": "system", "content": "You are a helpful assistant that translates text."},
-        {"role": "user", "content": f"Translate the following text to {target_language}:\n\n{text}"}
+        {"role": "system", "content": translate_system_prompt},
+        {"role": "user", "content": translate_prompt.format(language=target_language, text=text)}
     ]
-    return call_llm_model(model, messages)
+    return cached_llm_call(translate_system_prompt + translate_prompt, text, target_language, messages)
+
+# A function to stream a translation as text deltas
+def stream_translation(text, target_language):
+    messages = [
+        {"role": "system", "content": translate_system_prompt},
+        {"role": "user", "content": translate_prompt.format(language=target_language, text=text)}
+    ]
+    return cached_llm_stream(translate_system_prompt + translate_prompt, text, target_language, messages)
+
+# A function to pull a JSON object out of a model response (tolerates text around it)
+def parse_json_response(raw):
+    try:
+        return json.loads(raw)
+    except Exception:
+        m = re.search(r"\{[\s\S]*\}", raw or '')
+        if m:
+            try:
+                return json.loads(m.group(0))
+            except Exception:
+                return None
+    return None
+
+translate_fields_prompt = '''You are a helpful assistant that translates text.
+You receive a JSON object. Translate every string value to {language}.
+Reply with a JSON object that has exactly the same keys, without ```json.'''
+# A function to translate several texts ({key: text}) in one structured-JSON request.
+# Fields already in the cache are not sent; anything the model leaves out is translated on its own.
+def translate_fields(fields, target_language):
+    results = {}
+    pending = {}
+    for key, text in fields.items():
+        if not (text or '').strip():
+            results[key] = ''
+            continue
+        cached = llm_cache.get(cache_key(model, translate_system_prompt + translate_prompt, text, target_language, 1.0))
+        if cached is not None:
+            results[key] = cached
+        else:
+            pending[key] = text
+    if len(pending) == 1:
+        key, text = pending.popitem()
+        results[key] = translate_to_language(text, target_language)
+    elif pending:
+        messages = [
+            {"role": "system", "content": translate_fields_prompt.format(language=target_language)},
+            {"role": "user", "content": json.dumps(pending, ensure_ascii=False)}
+        ]
+        parsed = parse_json_response(call_llm_model(model, messages))
+        if not isinstance(parsed, dict):
+            parsed = {}
+        for key, text in pending.items():
+            value = parsed.get(key)
+            if isinstance(value, str):
+                # cache per field, so single-field translations of the same text hit too
+                llm_cache.set(cache_key(model, translate_system_prompt + translate_prompt, text, target_language, 1.0), value)
+            else:
+                value = translate_to_language(text, target_language)
+            results[key] = value
+    return results
+
+translate_marked_prompt = '''You are a helpful assistant that translates text.
+You receive texts that each start with a marker line such as <<<title>>>. Translate every text to {language}.
+Reply with the same marker lines, each followed by its translation, and nothing else.'''
+_FIELD_MARKER_RE = re.compile(r"\n*<<<([\w.]+)>>>(\n?)")
+# the end of the buffer that could still turn into a marker once more text arrives
+_PARTIAL_MARKER_RE = re.compile(r"\n*(?:<{1,2}|<<<[\w.]*>{0,2})?$")
+
+# A function to split a streamed "<<<key>>>\ntext..." answer into (key, delta) pairs as the text arrives
+def _split_marked_stream(deltas, keys):
+    key, buffer, fresh = None, '', False
+    for delta in deltas:
+        buffer += delta
+        start = 0
+        while True:
+            if fresh and buffer:
+                # the newline ending the marker line arrived in a later delta
+                buffer, fresh = buffer[1:] if buffer[0] == '\n' else buffer, False
+            m = _FIELD_MARKER_RE.search(buffer, start)
+            if m is None:
+                break
+            if m.group(1) not in keys:
+                # not one of the requested fields: literal text of the current one
+                start = m.end()
+                continue
+            if key is not None and m.start():
+                yield key, buffer[:m.start()]
+            key = m.group(1)
+            buffer, fresh, start = buffer[m.end():], not m.group(2), 0
+        hold = _PARTIAL_MARKER_RE.search(buffer).start()
+        if key is not None and hold:
+            yield key, buffer[:hold]
+        buffer = buffer[hold:]
+    if key is not None and buffer.rstrip('\n'):
+        yield key, buffer.rstrip('\n')
+
+# Streaming variant of translate_fields: yields (key, delta) pairs, with all uncached fields translated by one
+# streamed request. Cached fields come in one piece; a field the model leaves out is translated on its own.
+def stream_translate_fields(fields, target_language):
+    pending = {}
+    for key, text in fields.items():
+        if not (text or '').strip():
+            continue
+        cached = llm_cache.get(cache_key(model, translate_system_prompt + translate_prompt, text, target_language, 1.0))
+        if cached is not None:
+            yield key, cached
+        else:
+            pending[key] = text
+    if len(pending) == 1:
+        key, text = pending.popitem()
+        for delta in stream_translation(text, target_language):
+            yield key, delta
+        return
+    if not pending:
+        return
+    messages = [
+        {"role": "system", "content": translate_marked_prompt.format(language=target_language)},
+        {"role": "user", "content": '\n'.join(f"<<<{key}>>>\n{text}" for key, text in pending.items())}
+    ]
+    parts = {key: [] for key in pending}
+    for key, delta in _split_marked_stream(call_llm_model(model, messages, stream=True), pending):
+        parts[key].append(delta)
+        yield key, delta
+    for key, text in pending.items():
+        value = ''.join(parts[key]).strip()
+        if value:
+            llm_cache.set(cache_key(model, translate_system_prompt + translate_prompt, text, target_language, 1.0), value)
+        else:
+            yield key, translate_to_language(text, target_language)
+
+# A function to translate many notes ([{"id", "title", "content"}]): notes are packed into requests of about
+# LLM_BATCH_MAX_CHARS characters, and at most LLM_BULK_CONCURRENCY requests run at the same time.
+# Returns ({id: {"title", "content"}}, {id: error message})
+def translate_notes(notes, target_language):
+    batches = []
+    batch, size = {}, 0
+    for note in notes:
+        fields = {f"{note['id']}.title": note.get('title') or '', f"{note['id']}.content": note.get('content') or ''}
+        length = sum(len(v) for v in fields.values())
+        if batch and size + length > LLM_BATCH_MAX_CHARS:
+            batches.append(batch)
+            batch, size = {}, 0
+        batch.update(fields)
+        size += length
+    if batch:
+        batches.append(batch)
+
+    translated, errors = {}, {}
+    with ThreadPoolExecutor(max_workers=max(1, LLM_BULK_CONCURRENCY)) as pool:
+        futures = [(b, pool.submit(translate_fields, b, target_language)) for b in batches]
+        for b, future in futures:
+            ids = {key.rsplit('.', 1)[0] for key in b}
+            try:
+                result = future.result()
+            except Exception as e:
+                for note_id in ids:
+                    errors[note_id] = str(e)
+                continue
+            for key, value in result.items():
+                note_id, field = key.rsplit('.', 1)
+                translated.setdefault(note_id, {})[field] = value
+    return translated, errors
 
 
 
@@ -53,9 +304,18 @@ def extract_structured_notes(text, lang="English"):
         {"role": "system", "content": prompt},
         {"role": "user", "content": text}
     ]
-    response = call_llm_model(model, messages)
+    response = cached_llm_call(system_prompt, text, lang, messages)
     return response
 
+# A function to stream the structured-note extraction (raw JSON text) as deltas
+def stream_structured_notes(text, lang="English"):
+    prompt = system_prompt.format(lang=lang)
+    messages = [
+        {"role": "system", "content": prompt},
+        {"role": "user", "content": text}
+    ]
+    return cached_llm_stream(system_prompt, text, lang, messages)
+
 #main function for testing
 if __name__ == '__main__':
     sample_text = "Badminton tmr 5pm at Polyu"
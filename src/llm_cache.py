@@ -0,0 +1,186 @@
+"""Content-addressed cache for LLM completions.
+
+Entries are keyed on a hash of (model, prompt template, text, language, temperature, top_p), so a repeated
+translation or extraction of unchanged text is answered locally instead of calling the model again.
+
+Configured from the environment:
+  LLM_CACHE_BACKEND      memory (default, in-process LRU), sqlite (on-disk, shared by workers) or off
+  LLM_CACHE_TTL          seconds an entry stays valid (default 86400, 0 = never expires)
+  LLM_CACHE_MAX_ENTRIES  entries kept before least-recently-used ones are evicted (default 1024)
+  LLM_CACHE_PATH         database file for the sqlite backend (default database/llm_cache.db)
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+ROOT_DIR = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
+
+
+def cache_key(model, template, text, language, temperature, top_p=1.0):
+    """Stable hash of everything that determines the model's answer"""
+    payload = json.dumps([model, template, text, language, temperature, top_p], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class _Stats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def as_dict(self, backend, size, max_entries, ttl):
+        return {
+            'backend': backend,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'size': size,
+            'max_entries': max_entries,
+            'ttl': ttl,
+        }
+
+
+class LRUCache:
+    """In-process LRU with TTL; fastest, but private to each worker process"""
+    backend = 'memory'
+
+    def __init__(self, max_entries=1024, ttl=86400):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at or None, value)
+        self._lock = threading.Lock()
+        self._stats = _Stats()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self._stats.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._data[key]
+                self._stats.expirations += 1
+                self._stats.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self._stats.hits += 1
+            return value
+
+    def set(self, key, value):
+        expires_at = time.time() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self._stats.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return self._stats.as_dict(self.backend, len(self._data), self.max_entries, self.ttl)
+
+
+class SQLiteCache:
+    """On-disk cache in its own SQLite file, so entries survive restarts and are shared between workers"""
+    backend = 'sqlite'
+
+    def __init__(self, path, max_entries=1024, ttl=86400):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._stats = _Stats()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS llm_cache ('
+            'key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL, last_used REAL NOT NULL)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS ix_llm_cache_last_used ON llm_cache (last_used)')
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute('SELECT value, expires_at FROM llm_cache WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self._stats.misses += 1
+                return None
+            value, expires_at = row
+            if expires_at is not None and expires_at <= now:
+                self._conn.execute('DELETE FROM llm_cache WHERE key = ?', (key,))
+                self._stats.expirations += 1
+                self._stats.misses += 1
+                return None
+            self._conn.execute('UPDATE llm_cache SET last_used = ? WHERE key = ?', (now, key))
+            self._stats.hits += 1
+            return value
+
+    def set(self, key, value):
+        now = time.time()
+        expires_at = now + self.ttl if self.ttl else None
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO llm_cache (key, value, expires_at, last_used) VALUES (?, ?, ?, ?)',
+                (key, value, expires_at, now))
+            size = self._conn.execute('SELECT count(*) FROM llm_cache').fetchone()[0]
+            if size > self.max_entries:
+                evicted = self._conn.execute(
+                    'DELETE FROM llm_cache WHERE key IN '
+                    '(SELECT key FROM llm_cache ORDER BY last_used LIMIT ?)', (size - self.max_entries,)).rowcount
+                self._stats.evictions += evicted
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute('DELETE FROM llm_cache')
+
+    def stats(self):
+        with self._lock:
+            size = self._conn.execute('SELECT count(*) FROM llm_cache').fetchone()[0]
+            return self._stats.as_dict(self.backend, size, self.max_entries, self.ttl)
+
+
+class NullCache:
+    """Caching disabled: every lookup is a miss"""
+    backend = 'off'
+
+    def __init__(self):
+        self._stats = _Stats()
+
+    def get(self, key):
+        self._stats.misses += 1
+        return None
+
+    def set(self, key, value):
+        pass
+
+    def clear(self):
+        pass
+
+    def stats(self):
+        return self._stats.as_dict(self.backend, 0, 0, 0)
+
+
+def make_cache():
+    """Build the cache selected by LLM_CACHE_BACKEND"""
+    backend = os.getenv('LLM_CACHE_BACKEND', 'memory').lower()
+    ttl = int(os.getenv('LLM_CACHE_TTL', '86400'))
+    max_entries = int(os.getenv('LLM_CACHE_MAX_ENTRIES', '1024'))
+    if backend == 'off':
+        return NullCache()
+    if backend == 'sqlite':
+        path = os.getenv('LLM_CACHE_PATH', os.path.join(ROOT_DIR, 'database', 'llm_cache.db'))
+        return SQLiteCache(path, max_entries=max_entries, ttl=ttl)
+    if backend != 'memory':
+        raise ValueError(f'Unknown LLM_CACHE_BACKEND: {backend}')
+    return LRUCache(max_entries=max_entries, ttl=ttl)
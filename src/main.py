@@ -6,70 +6,121 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 from flask import Flask, send_from_directory
 from flask_cors import CORS
 from src.models.user import db
-from src.routes.user import user_bp
-from src.routes.note import note_bp
-from src.models.note import Note
-
-# Create Flask app
-app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
-
-# Configuration
-from dotenv import load_dotenv
-load_dotenv()
-
-app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'asdf#FGSgvasgf$5$WGT')
-
-# Enable CORS for all routes
-CORS(app)
-
-# Register blueprints
-app.register_blueprint(user_bp, url_prefix='/api')
-app.register_blueprint(note_bp, url_prefix='/api')
-
-# Database configuration - support both SQLite (local) and PostgreSQL (production)
-DATABASE_URL = os.environ.get('DATABASE_URL')
-if DATABASE_URL:
-    # Production: Use Supabase PostgreSQL
-    # Handle postgres:// vs postgresql:// prefix for newer SQLAlchemy versions
-    if DATABASE_URL.startswith('postgres://'):
-        DATABASE_URL = DATABASE_URL.replace('postgres://', 'postgresql://', 1)
-    app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URL
-    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-        'pool_pre_ping': True,
-        'pool_recycle': 300,
-    }
-else:
-    # Local development: Use SQLite
-    ROOT_DIR = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
-    DB_PATH = os.path.join(ROOT_DIR, 'database', 'app.db')
-    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{DB_PATH}"
-
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-
-# Initialize database
-db.init_app(app)
-with app.app_context():
-    db.create_all()
-
-@app.route('/', defaults={'path': ''})
-@app.route('/<path:path>')
-def serve(path):
-    static_folder_path = app.static_folder
-    if static_folder_path is None:
-        return "Static folder not configured", 404
-
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
+
+ROOT_DIR = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
+
+
+def migrate_database(app, log=print):
+    """Apply pending schema migrations (src/migrations). Returns the versions applied.
+    Run once per deploy with `flask --app src.main migrate`; local SQLite databases are migrated on startup.
+    """
+    from src.migrations import migrate
+    with app.app_context():
+        return migrate(db.engine, log=log)
+
+
+def create_app():
+    """Build the Flask app. Nothing here talks to the database unless AUTO_MIGRATE is on,
+    and the LLM client (openai SDK) is only loaded by the routes that call it.
+    """
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+    app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'asdf#FGSgvasgf$5$WGT')
+
+    # Enable CORS for all routes
+    CORS(app, expose_headers=['X-Next-Cursor', 'X-Sync-Cursor'])
+
+    # Register blueprints
+    from src.routes.user import user_bp
+    from src.routes.note import note_bp
+    from src.routes.job import job_bp
+    from src.routes.metrics import metrics_bp
+    app.register_blueprint(user_bp, url_prefix='/api')
+    app.register_blueprint(note_bp, url_prefix='/api')
+    app.register_blueprint(job_bp, url_prefix='/api')
+    app.register_blueprint(metrics_bp, url_prefix='/api')
+
+    # Server-Timing headers, slow request logging and /api/metrics counters
+    from src import instrumentation
+    instrumentation.init_app(app)
+
+    # Database configuration - support both SQLite (local) and PostgreSQL (production)
+    DATABASE_URL = os.environ.get('DATABASE_URL')
+    if DATABASE_URL:
+        # Production: Use Supabase PostgreSQL
+        # Handle postgres:// vs postgresql:// prefix for newer SQLAlchemy versions
+        if DATABASE_URL.startswith('postgres://'):
+            DATABASE_URL = DATABASE_URL.replace('postgres://', 'postgresql://', 1)
+        app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URL
     else:
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
+        # Local development: Use SQLite
+        DB_PATH = os.path.join(ROOT_DIR, 'database', 'app.db')
+        os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{DB_PATH}"
+
+    # pool settings, and WAL / pragmas for SQLite (src/db_config.py)
+    from src import db_config
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = db_config.engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    # Initialize database
+    db.init_app(app)
+    db_config.init_app(app, db)
+
+    # optional read replicas (DATABASE_READ_URLS) for the read-only note views
+    from src import db_routing
+    db_routing.init_app(app)
+
+    import click
+
+    @app.cli.command('migrate')
+    @click.option('--status', is_flag=True, help='List applied and pending migrations without applying any.')
+    def migrate_command(status):
+        """Apply pending schema migrations."""
+        if status:
+            from src.migrations import all_migrations, applied_versions
+            with app.app_context():
+                applied = applied_versions(db.engine)
+            for m in all_migrations():
+                print(f"{m.version:04d} {'applied' if m.version in applied else 'pending'}  {m.name}")
+            return
+        migrate_database(app)
+        print('Database is up to date.')
+
+    # schema setup is a round trip to a remote database, so by default it only runs on startup for SQLite
+    default_auto = 'true' if app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite') else 'false'
+    app.config['AUTO_MIGRATE'] = os.getenv('AUTO_MIGRATE', default_auto).lower() in ('1', 'true', 'yes')
+    if app.config['AUTO_MIGRATE']:
+        migrate_database(app, log=app.logger.info)
+
+    @app.route('/', defaults={'path': ''})
+    @app.route('/<path:path>')
+    def serve(path):
+        static_folder_path = app.static_folder
+        if static_folder_path is None:
+            return "Static folder not configured", 404
+
+        if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
+            return send_from_directory(static_folder_path, path)
         else:
-            return "index.html not found", 404
+            index_path = os.path.join(static_folder_path, 'index.html')
+            if os.path.exists(index_path):
+                return send_from_directory(static_folder_path, 'index.html')
+            else:
+                return "index.html not found", 404
+
+    return app
+
+
+# Create Flask app (imported by wsgi.py and api/index.py)
+app = create_app()
 
 if __name__ == '__main__':
     # Local development
+    if not app.config['AUTO_MIGRATE']:
+        migrate_database(app)
     port = int(os.getenv('PORT', 5001))
     debug = os.getenv('FLASK_ENV') == 'development'
     app.run(host='0.0.0.0', port=port, debug=debug)
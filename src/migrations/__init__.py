@@ -0,0 +1,139 @@
+"""Versioned schema migrations for SQLite and PostgreSQL.
+
+Each migration in src/migrations/versions.py is registered with @migration(version, name) and runs once per
+database; applied versions are recorded in the schema_version table. Steps are written to be idempotent, so a
+database created earlier by db.create_all() is brought under version control by simply running them.
+
+Migrations marked transactional=False run on an autocommit connection. On PostgreSQL they create indexes with
+CREATE INDEX CONCURRENTLY, which does not block writes to the table while the index builds.
+
+Run with:
+    flask --app src.main migrate            apply pending migrations
+    flask --app src.main migrate --status   list applied and pending migrations
+"""
+from datetime import datetime
+from sqlalchemy import MetaData, Table, Column, Integer, String, DateTime, text, select, insert, inspect
+
+# pg_advisory_lock key held while migrating, so two deploys cannot apply the same migration at once
+MIGRATION_LOCK_KEY = 0x6d696772
+
+_metadata = MetaData()
+schema_version = Table(
+    'schema_version', _metadata,
+    Column('version', Integer, primary_key=True, autoincrement=False),
+    Column('name', String(200), nullable=False),
+    Column('applied_at', DateTime(timezone=True), nullable=False),
+)
+
+
+class Migration:
+    def __init__(self, version, name, fn, transactional):
+        self.version = version
+        self.name = name
+        self.fn = fn
+        self.transactional = transactional
+
+    def __repr__(self):
+        return f'<Migration {self.version:04d} {self.name}>'
+
+
+_migrations = {}
+
+
+def migration(version, name, transactional=True):
+    """Register `fn(conn)` as migration `version`"""
+    def register(fn):
+        if version in _migrations:
+            raise ValueError(f'Duplicate migration version {version}')
+        _migrations[version] = Migration(version, name, fn, transactional)
+        return fn
+    return register
+
+
+def all_migrations():
+    from src.migrations import versions  # noqa: F401 (registers the migrations)
+    return [_migrations[v] for v in sorted(_migrations)]
+
+
+def applied_versions(engine):
+    with engine.begin() as conn:
+        schema_version.create(conn, checkfirst=True)
+        return set(conn.execute(select(schema_version.c.version)).scalars())
+
+
+def migrate(engine, target=None, log=print):
+    """Apply pending migrations up to `target` (default: all). Returns the versions applied."""
+    from src.db_config import DB_PGBOUNCER
+    done = []
+    # a session-level lock cannot be held through a transaction-mode pooler (each statement may use another backend)
+    use_lock = engine.dialect.name == 'postgresql' and not DB_PGBOUNCER
+    if engine.dialect.name == 'postgresql' and DB_PGBOUNCER:
+        log('DB_PGBOUNCER is set: migrating without the advisory lock. '
+            'Prefer a direct or session-mode connection for migrations.')
+    # session-level lock on an autocommit connection: no open transaction that a concurrent index build would wait on
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as lock_conn:
+        if use_lock:
+            lock_conn.execute(text('SELECT pg_advisory_lock(:key)'), {'key': MIGRATION_LOCK_KEY})
+        try:
+            applied = applied_versions(engine)
+            for m in all_migrations():
+                if m.version in applied or (target is not None and m.version > target):
+                    continue
+                log(f'Applying migration {m.version:04d} {m.name}')
+                if m.transactional:
+                    with engine.begin() as conn:
+                        m.fn(conn)
+                        _record(conn, m)
+                else:
+                    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+                        m.fn(conn)
+                        _record(conn, m)
+                done.append(m.version)
+        finally:
+            if use_lock:
+                lock_conn.execute(text('SELECT pg_advisory_unlock(:key)'), {'key': MIGRATION_LOCK_KEY})
+    return done
+
+
+def _record(conn, m):
+    conn.execute(insert(schema_version).values(version=m.version, name=m.name, applied_at=datetime.utcnow()))
+
+
+# helpers for migration steps
+
+def has_table(conn, table):
+    return inspect(conn).has_table(table)
+
+
+def has_column(conn, table, column):
+    return any(c['name'] == column for c in inspect(conn).get_columns(table))
+
+
+def add_column(conn, table, column, type_sql):
+    """ALTER TABLE ... ADD COLUMN unless it exists. A nullable column without a default is a catalog-only change
+    on PostgreSQL (no table rewrite)."""
+    if not has_column(conn, table, column):
+        conn.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {type_sql}'))
+
+
+def drop_index(conn, name):
+    """DROP INDEX IF EXISTS, CONCURRENTLY on PostgreSQL (needs transactional=False)"""
+    concurrently = ' CONCURRENTLY' if conn.dialect.name == 'postgresql' else ''
+    conn.execute(text(f'DROP INDEX{concurrently} IF EXISTS {name}'))
+
+
+def create_index(conn, name, table, columns, using=None):
+    """CREATE INDEX IF NOT EXISTS. On PostgreSQL the index is built CONCURRENTLY, which needs an autocommit
+    connection (transactional=False); an invalid index left behind by an interrupted build is dropped and rebuilt.
+    `columns` is the SQL inside the parentheses, e.g. "tag, note_id".
+    """
+    if conn.dialect.name == 'postgresql':
+        valid = conn.execute(text(
+            "SELECT i.indisvalid FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid WHERE c.relname = :name"),
+            {'name': name}).scalar()
+        if valid is False:
+            conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS {name}'))
+        using_sql = f' USING {using}' if using else ''
+        conn.execute(text(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table}{using_sql} ({columns})'))
+    else:
+        conn.execute(text(f'CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})'))
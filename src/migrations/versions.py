@@ -0,0 +1,174 @@
+"""Schema history. Append new migrations at the end with the next version number; never edit applied ones.
+
+Table definitions here are frozen copies of what each version introduced (not the live models), so replaying the
+history on an empty database always gives the same schema.
+"""
+from sqlalchemy import (MetaData, Table, Column, Integer, BigInteger, String, Text, DateTime, ForeignKey,
+                        table, column, select, insert, exists)
+from src.migrations import migration, add_column, create_index, drop_index
+
+_metadata = MetaData()
+
+users = Table(
+    'users', _metadata,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('username', String(80), unique=True, nullable=False),
+    Column('email', String(120), unique=True, nullable=False),
+    Column('created_at', DateTime(timezone=True)),
+    Column('updated_at', DateTime(timezone=True)),
+)
+
+notes = Table(
+    'notes', _metadata,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('title', String(200), nullable=False),
+    Column('content', Text, nullable=False),
+    Column('created_at', DateTime(timezone=True)),
+    Column('updated_at', DateTime(timezone=True)),
+)
+
+note_tags = Table(
+    'note_tags', _metadata,
+    Column('note_id', Integer, ForeignKey('notes.id', ondelete='CASCADE'), primary_key=True),
+    Column('tag', String(100), primary_key=True),
+)
+
+note_tombstones = Table(
+    'note_tombstones', _metadata,
+    Column('note_id', Integer, primary_key=True, autoincrement=False),
+    Column('deleted_at', DateTime(timezone=True), nullable=False),
+)
+
+jobs = Table(
+    'jobs', _metadata,
+    Column('id', String(32), primary_key=True),
+    Column('kind', String(50), nullable=False),
+    Column('status', String(20), nullable=False),
+    Column('payload', Text, nullable=False),
+    Column('result', Text),
+    Column('error', Text),
+    Column('created_at', DateTime(timezone=True)),
+    Column('updated_at', DateTime(timezone=True)),
+)
+
+sync_state = Table(
+    'sync_state', _metadata,
+    Column('id', Integer, primary_key=True, autoincrement=False),
+    Column('change_seq', BigInteger, nullable=False, default=0),
+)
+
+TAG_BACKFILL_CHUNK_SIZE = 1000
+
+
+@migration(1, 'create users and notes tables')
+def create_base_tables(conn):
+    users.create(conn, checkfirst=True)
+    notes.create(conn, checkfirst=True)
+
+
+@migration(2, 'add tags, position, event_date and event_time to notes')
+def add_note_fields(conn):
+    add_column(conn, 'notes', 'tags', 'TEXT')
+    add_column(conn, 'notes', 'position', 'INTEGER')
+    add_column(conn, 'notes', 'event_date', 'DATE')
+    add_column(conn, 'notes', 'event_time', 'TIME')
+
+
+def _split_tags_v3(tags):
+    """notes.tags as note_tags rows: comma-separated, stripped, at most 100 characters, non-empty, unique, in order.
+    A frozen copy of src.models.note.split_tags() as of migration 3, so later changes to it do not alter the backfill.
+    """
+    values = []
+    for t in tags.split(','):
+        t = t.strip()[:100]
+        if t and t not in values:
+            values.append(t)
+    return values
+
+
+@migration(3, 'create note_tags and backfill it from notes.tags')
+def create_note_tags(conn):
+    note_tags.create(conn, checkfirst=True)
+    tagged = table('notes', column('id'), column('tags'))
+    pending = (
+        select(tagged.c.id, tagged.c.tags)
+        .where(tagged.c.tags.isnot(None), tagged.c.tags != '')
+        .where(~exists().where(note_tags.c.note_id == tagged.c.id))
+        .order_by(tagged.c.id)
+    )
+    last_id = 0
+    while True:
+        rows = conn.execute(pending.where(tagged.c.id > last_id).limit(TAG_BACKFILL_CHUNK_SIZE)).all()
+        if not rows:
+            break
+        values = [{'note_id': note_id, 'tag': tag} for note_id, tags in rows for tag in _split_tags_v3(tags)]
+        if values:
+            conn.execute(insert(note_tags), values)
+        last_id = rows[-1][0]
+
+
+@migration(4, 'create note_tombstones')
+def create_note_tombstones(conn):
+    note_tombstones.create(conn, checkfirst=True)
+
+
+@migration(5, 'create jobs')
+def create_jobs(conn):
+    jobs.create(conn, checkfirst=True)
+
+
+@migration(6, 'add indexes for tags, ordering, sync and jobs', transactional=False)
+def add_indexes(conn):
+    create_index(conn, 'ix_note_tags_tag', 'note_tags', 'tag, note_id')
+    create_index(conn, 'ix_notes_position', 'notes', 'position')
+    create_index(conn, 'ix_notes_updated_at', 'notes', 'updated_at')
+    create_index(conn, 'ix_note_tombstones_deleted_at', 'note_tombstones', 'deleted_at')
+    create_index(conn, 'ix_jobs_status', 'jobs', 'status')
+
+
+@migration(7, 'add full-text search index', transactional=False)
+def add_search_index(conn):
+    from src.search import install_search_index
+    install_search_index(conn)
+
+
+@migration(8, 'add composite index for the note list order', transactional=False)
+def add_list_order_index(conn):
+    # matches src.models.note.list_order(); `position IS NULL` first stands in for NULLS LAST
+    create_index(conn, 'ix_notes_list_order', 'notes', '(position IS NULL), position, updated_at DESC, id DESC')
+
+
+@migration(9, 'add notes.version for optimistic concurrency')
+def add_note_version(conn):
+    # a constant default: no table rewrite on PostgreSQL 11+; existing rows start at 1
+    add_column(conn, 'notes', 'version', 'INTEGER NOT NULL DEFAULT 1')
+
+
+@migration(10, 'put notes without updated_at in a fixed place in the list order index', transactional=False)
+def rebuild_list_order_index(conn):
+    # matches src.models.note.list_order(); an interrupted run rebuilds the index again
+    drop_index(conn, 'ix_notes_list_order')
+    create_index(conn, 'ix_notes_list_order', 'notes',
+                 '(position IS NULL), position, (updated_at IS NULL), updated_at DESC, id DESC')
+
+
+@migration(11, 'add the change counter used as the delta sync cursor')
+def add_change_seq(conn):
+    sync_state.create(conn, checkfirst=True)
+    if conn.execute(select(sync_state.c.id).where(sync_state.c.id == 1)).first() is None:
+        conn.execute(insert(sync_state).values(id=1, change_seq=0))
+    # existing rows are change 0: clients resync them once through the full list
+    add_column(conn, 'notes', 'change_seq', 'BIGINT NOT NULL DEFAULT 0')
+    add_column(conn, 'note_tombstones', 'change_seq', 'BIGINT NOT NULL DEFAULT 0')
+
+
+@migration(12, 'add indexes for the delta sync cursor', transactional=False)
+def add_change_seq_indexes(conn):
+    create_index(conn, 'ix_notes_change_seq', 'notes', 'change_seq')
+    create_index(conn, 'ix_note_tombstones_change_seq', 'note_tombstones', 'change_seq')
+
+
+@migration(13, 'add job worker ids and heartbeats')
+def add_job_heartbeat(conn):
+    add_column(conn, 'jobs', 'worker_id', 'VARCHAR(64)')
+    add_column(conn, 'jobs', 'heartbeat_at', DateTime(timezone=True).compile(dialect=conn.dialect))
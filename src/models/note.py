@@ -1,26 +1,52 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.orm import Session
 from src.models.user import db
 
+TITLE_MAX_LENGTH = 200
+TAG_MAX_LENGTH = 100
+# positions are spaced out so a single note can be moved between two others without renumbering
+POSITION_GAP = 1024
+# pg_advisory_xact_lock key that serializes position allocation on PostgreSQL
+POSITION_LOCK_KEY = 0x6e6f7465
+# ids per UPDATE statement when writing many positions (keeps bind params well under SQLite's limit)
+POSITION_CHUNK_SIZE = 500
+
 class Note(db.Model):
     __tablename__ = 'notes'  # Explicit table name for PostgreSQL
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    title = db.Column(db.String(200), nullable=False)
+    title = db.Column(db.String(TITLE_MAX_LENGTH), nullable=False)
     content = db.Column(db.Text, nullable=False)
     # new fields
     tags = db.Column(db.Text, nullable=True)  # stored as comma-separated string, e.g. "tag1,tag2"
-    position = db.Column(db.Integer, nullable=True)
+    position = db.Column(db.Integer, nullable=True, index=True)
     event_date = db.Column(db.Date, nullable=True)
     event_time = db.Column(db.Time, nullable=True)
 
     # Use timezone-aware datetime for PostgreSQL compatibility
     created_at = db.Column(db.DateTime(timezone=True), default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
+    # indexed: max(updated_at) is part of the list ETag
+    updated_at = db.Column(db.DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    # concurrency token for PATCH: incremented by content writes only, not by reorders (which do bump updated_at)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    # next_change_seq() of the transaction that last wrote the note (content or position); the delta sync cursor
+    change_seq = db.Column(db.BigInteger, nullable=False, default=0, server_default='0', index=True)
+
+    # normalized copy of `tags`, used for indexed tag filtering and counts
+    tag_rows = db.relationship('NoteTag', cascade='all, delete-orphan', lazy='select')
 
     def __repr__(self):
         return f'<Note {self.title}>'
 
+    def set_tags(self, tags):
+        """Set tags from a list or comma-separated string, keeping `tags` and note_tags in sync"""
+        values = split_tags(tags)
+        self.tags = ','.join(values) or None
+        existing = {row.tag: row for row in self.tag_rows}
+        self.tag_rows = [existing.get(t) or NoteTag(tag=t) for t in values]
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -32,6 +58,217 @@ class Note(db.Model):
             'event_date': self.event_date.isoformat() if self.event_date else None,
             'event_time': self.event_time.isoformat() if self.event_time else None,
             'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'version': self.version
         }
 
+
+# serves the list order (list_order()) so pages of GET /api/notes are read in index order without a sort
+db.Index('ix_notes_list_order', Note.position.is_(None), Note.position, Note.updated_at.is_(None),
+         Note.updated_at.desc(), Note.id.desc())
+
+
+def list_order():
+    """ORDER BY of the note list: by position with unpositioned notes last, then most recently updated (notes
+    without updated_at last), then by id descending.
+    `position IS NULL` and `updated_at IS NULL` stand in for NULLS LAST, which SQLite indexes cannot express and
+    which the two databases would otherwise resolve differently; with them both SQLite and PostgreSQL read the list
+    straight from ix_notes_list_order.
+    """
+    notes = Note.__table__
+    return (notes.c.position.is_(None), notes.c.position, notes.c.updated_at.is_(None), notes.c.updated_at.desc(),
+            notes.c.id.desc())
+
+
+class NoteTag(db.Model):
+    __tablename__ = 'note_tags'
+
+    note_id = db.Column(db.Integer, db.ForeignKey('notes.id', ondelete='CASCADE'), primary_key=True)
+    tag = db.Column(db.String(TAG_MAX_LENGTH), primary_key=True)
+
+    # (tag, note_id) serves both tag filtering and the per-tag counts of GET /api/tags
+    __table_args__ = (db.Index('ix_note_tags_tag', 'tag', 'note_id'),)
+
+    def __repr__(self):
+        return f'<NoteTag {self.note_id}:{self.tag}>'
+
+
+class NoteTombstone(db.Model):
+    """Record of a deleted note, so clients syncing through GET /api/notes/changes learn about deletions"""
+    __tablename__ = 'note_tombstones'
+
+    note_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    deleted_at = db.Column(db.DateTime(timezone=True), default=datetime.utcnow, nullable=False, index=True)
+    change_seq = db.Column(db.BigInteger, nullable=False, default=0, server_default='0', index=True)
+
+    def __repr__(self):
+        return f'<NoteTombstone {self.note_id}>'
+
+
+class SyncState(db.Model):
+    """Single-row counter numbering the transactions that change notes (see next_change_seq())"""
+    __tablename__ = 'sync_state'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    change_seq = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+def next_change_seq():
+    """Change number for every note and tombstone row this transaction writes; one number per transaction.
+    It comes from incrementing the sync_state row, whose write lock is held until commit, so numbers become visible
+    in order: once current_change_seq() returns N, every change numbered N or lower has committed. Call it before
+    taking other locks (position lock, note rows), so writers always queue for them in the same order.
+    """
+    from sqlalchemy import update
+    seq = db.session.info.get('change_seq')
+    if seq is None:
+        state = SyncState.__table__
+        seq = db.session.execute(
+            update(state).where(state.c.id == 1).values(change_seq=state.c.change_seq + 1).returning(state.c.change_seq)
+        ).scalar_one()
+        db.session.info['change_seq'] = seq
+    return seq
+
+
+def current_change_seq():
+    """Number of the last committed change (the delta sync cursor)"""
+    from sqlalchemy import select
+    state = SyncState.__table__
+    return db.session.execute(select(state.c.change_seq).where(state.c.id == 1)).scalar_one()
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def _reset_change_seq(session, transaction):
+    # the number belongs to one transaction; the next one takes a new number
+    if transaction.parent is None:
+        session.info.pop('change_seq', None)
+
+
+def split_tags(tags):
+    """Normalize a list or comma-separated string of tags: stripped, non-empty, unique, in order"""
+    if not tags:
+        return []
+    if isinstance(tags, str):
+        tags = tags.split(',')
+    values = []
+    for t in tags:
+        if t is None:
+            continue
+        t = str(t).strip()[:TAG_MAX_LENGTH]
+        if t and t not in values:
+            values.append(t)
+    return values
+
+
+def _lock_positions():
+    """Keep concurrent creates from reading the same MAX(position) until this transaction commits.
+    PostgreSQL: a transaction-scoped advisory lock. SQLite: the database write lock, taken up front with
+    BEGIN IMMEDIATE, because pysqlite would only begin the transaction at the first INSERT, after the read.
+    """
+    from sqlalchemy import text
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        db.session.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': POSITION_LOCK_KEY})
+    elif dialect == 'sqlite':
+        connection = db.session.connection().connection.dbapi_connection
+        # already in a transaction: it has written, so it holds the write lock
+        if not connection.in_transaction:
+            db.session.execute(text('BEGIN IMMEDIATE'))
+
+
+def next_position():
+    """SQL expression for the position after the last note, to be assigned to Note.position before insert.
+    It is evaluated inside the INSERT itself (INSERT ... VALUES (..., (SELECT COALESCE(MAX(position), 0) + gap))),
+    and MAX(position) is answered from ix_notes_position, so the cost does not grow with the table.
+    Concurrent creates cannot read the same MAX: see _lock_positions().
+    """
+    from sqlalchemy import select, func
+    _lock_positions()
+    return select(func.coalesce(func.max(Note.position), 0) + POSITION_GAP).scalar_subquery()
+
+
+def reserve_positions(count):
+    """Positions for `count` new notes appended after the last one, from a single MAX(position) read.
+    The read happens under _lock_positions(), which next_position() creates also wait for, so a concurrent create
+    cannot take a position inside the block before this transaction commits.
+    """
+    from sqlalchemy import select, func
+    _lock_positions()
+    last = db.session.execute(select(func.coalesce(func.max(Note.position), 0))).scalar()
+    return [last + POSITION_GAP * i for i in range(1, count + 1)]
+
+
+def write_positions(positions):
+    """Write {note_id: position} with one UPDATE ... SET position = CASE id ... per chunk instead of a query per note.
+    Moving a note is not an edit: updated_at keeps its value (setting it explicitly skips the column's onupdate).
+    """
+    from sqlalchemy import update, case
+    notes = Note.__table__
+    items = list(positions.items())
+    for start in range(0, len(items), POSITION_CHUNK_SIZE):
+        chunk = dict(items[start:start + POSITION_CHUNK_SIZE])
+        db.session.execute(
+            update(notes)
+            .where(notes.c.id.in_(list(chunk)))
+            .values(position=case(chunk, value=notes.c.id), updated_at=notes.c.updated_at, change_seq=next_change_seq())
+        )
+
+
+def renumber_positions(order=None):
+    """Give notes evenly gapped positions following `order` (note ids), or the current list order.
+    Ids that do not exist are ignored; notes missing from `order` keep their relative order after it.
+    """
+    from sqlalchemy import select
+    notes = Note.__table__
+    rows = db.session.execute(select(notes.c.id, notes.c.position).order_by(*list_order())).all()
+    old_positions = dict(rows)
+    current = [note_id for note_id, _ in rows]
+    if order is not None:
+        existing = set(current)
+        seen = set()
+        ordered = []
+        for note_id in order:
+            if note_id in existing and note_id not in seen:
+                seen.add(note_id)
+                ordered.append(note_id)
+        current = ordered + [note_id for note_id in current if note_id not in seen]
+    # only the notes whose position changes are written
+    write_positions({note_id: idx * POSITION_GAP for idx, note_id in enumerate(current, start=1)
+                     if old_positions[note_id] != idx * POSITION_GAP})
+
+
+def move_note(note_id, after_id=None):
+    """Move one note directly after `after_id` (or to the top when None), touching O(1) rows.
+    Falls back to renumbering everything only when there is no gap left between the neighbours.
+    Returns the new position, or None if either note does not exist.
+    """
+    from sqlalchemy import select, func
+    notes = Note.__table__
+    for attempt in range(2):
+        if db.session.execute(select(notes.c.id).where(notes.c.id == note_id)).first() is None:
+            return None
+        if after_id is None:
+            first = db.session.execute(select(func.min(notes.c.position)).where(notes.c.id != note_id)).scalar()
+            new_position = (first if first is not None else POSITION_GAP) - POSITION_GAP
+            break
+        row = db.session.execute(select(notes.c.position).where(notes.c.id == after_id)).first()
+        if row is None:
+            return None
+        after_position = row.position
+        if after_position is not None:
+            following = db.session.execute(
+                select(func.min(notes.c.position))
+                .where(notes.c.position > after_position, notes.c.id != note_id)
+            ).scalar()
+            if following is None:
+                new_position = after_position + POSITION_GAP
+                break
+            if following - after_position >= 2:
+                new_position = (after_position + following) // 2
+                break
+        # no room (or unpositioned neighbour): spread everything out once, then retry
+        renumber_positions()
+    else:
+        return None
+    write_positions({note_id: new_position})
+    return new_position
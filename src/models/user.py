@@ -1,7 +1,9 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+from src.db_routing import RoutingSession
 
-db = SQLAlchemy()
+# RoutingSession sends the reads of @read_replica views to DATABASE_READ_URLS when configured
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class User(db.Model):
     __tablename__ = 'users'  # Explicit table name for PostgreSQL
@@ -0,0 +1,12 @@
+from flask import Blueprint, jsonify
+from src.models.job import Job
+
+job_bp = Blueprint('job', __name__)
+
+@job_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Get the status of a background job; `result` is set once status is `succeeded`"""
+    from src.jobs import resume_jobs_once
+    resume_jobs_once()
+    job = Job.query.get_or_404(job_id)
+    return jsonify(job.to_dict())
@@ -0,0 +1,33 @@
+from flask import Blueprint, Response, current_app
+from src.instrumentation import metrics
+from src import db_config
+
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Process metrics in Prometheus text format: requests, SQL statements, connection pools, LLM calls, the LLM cache
+    and read replicas"""
+    from src.llm import cache_stats
+    stats = cache_stats()
+    labels = {'backend': stats['backend']}
+    extra = [
+        ('llm_cache_hits_total', 'counter', 'LLM cache hits', [(labels, stats['hits'])]),
+        ('llm_cache_misses_total', 'counter', 'LLM cache misses', [(labels, stats['misses'])]),
+        ('llm_cache_evictions_total', 'counter', 'LLM cache entries evicted for space', [(labels, stats['evictions'])]),
+        ('llm_cache_expirations_total', 'counter', 'LLM cache entries dropped after their TTL', [(labels, stats['expirations'])]),
+        ('llm_cache_entries', 'gauge', 'LLM cache entries stored', [(labels, stats['size'])]),
+    ]
+    extra += db_config.pool_families()
+    replicas = current_app.extensions.get('read_replicas')
+    if replicas is not None:
+        replica_stats = replicas.stats()
+        extra += [
+            ('db_replica_up', 'gauge', 'Read replica passed its last health check',
+             [({'replica': name}, int(healthy)) for name, healthy, _ in replica_stats]),
+            ('db_replica_reads_total', 'counter', 'Sessions whose reads went to the replica',
+             [({'replica': name}, reads) for name, _, reads in replica_stats]),
+            ('db_replica_primary_fallbacks_total', 'counter', 'Replica reads sent to the primary (no healthy replica)',
+             [({}, replicas.primary_fallbacks)]),
+        ]
+    return Response(metrics.render(extra), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -1,16 +1,198 @@
-from flask import Blueprint, jsonify, request
-from src.models.note import Note, db
-# import translate helper from llm
-from src.llm import translate_to_language, extract_structured_notes
+from datetime import datetime
+from flask import Blueprint, jsonify, request, make_response, abort
+from sqlalchemy import select
+from src.models.note import Note, NoteTag, NoteTombstone, db, split_tags, move_note, next_position, \
+    reserve_positions, renumber_positions, list_order, next_change_seq, current_change_seq, TITLE_MAX_LENGTH
+# LLM helpers (src.llm, which loads the openai SDK) are imported inside the handlers that use them,
+# so importing the app stays fast on serverless cold starts
+from src.jobs import job_handler, submit_job
+from src.db_routing import read_replica
+from src.serialization import serialize_rows, json_response, dumps
 
 note_bp = Blueprint('note', __name__)
 
+# fields that can be requested through ?fields=, in to_dict() order
+NOTE_FIELDS = ('id', 'title', 'content', 'tags', 'position', 'event_date', 'event_time', 'created_at', 'updated_at',
+               'version')
+# `preview` is a truncated content computed in SQL, so the full content column is never loaded
+PREVIEW_LENGTH = 120
+MAX_PAGE_SIZE = 500
+MAX_BULK_TRANSLATE = 100
+# operations accepted by one POST /api/notes/batch, and rows per statement when applying them
+MAX_BATCH_OPERATIONS = 100000
+BATCH_CHUNK_SIZE = 500
+# rows fetched per round trip by the export cursor, and notes inserted per commit by the import
+EXPORT_CHUNK_SIZE = 1000
+IMPORT_CHUNK_SIZE = 1000
+# invalid lines reported back by an import (the rest are only counted)
+MAX_IMPORT_ERRORS = 100
+
+
+def _encode_cursor(row):
+    """Encode the sort key (position, updated_at, id) of the last row of a page"""
+    import base64, json
+    key = [row.position, row.updated_at.isoformat() if row.updated_at else None, row.id]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip('=')
+
+
+def _decode_cursor(cursor):
+    import base64, json
+    raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+    position, updated_at, note_id = json.loads(raw)
+    if position is not None:
+        position = int(position)
+    return position, (datetime.fromisoformat(updated_at) if updated_at else None), int(note_id)
+
+
+def _after_cursor(cursor):
+    """Keyset condition for rows after `cursor` in list_order():
+    (position NULLS LAST, updated_at DESC NULLS LAST, id DESC)"""
+    c = Note.__table__.c
+    position, updated_at, note_id = cursor
+    if updated_at is None:
+        later = c.updated_at.is_(None) & (c.id < note_id)
+    else:
+        later = (c.updated_at < updated_at) | c.updated_at.is_(None) | ((c.updated_at == updated_at) & (c.id < note_id))
+    if position is None:
+        return c.position.is_(None) & later
+    return (c.position > position) | c.position.is_(None) | ((c.position == position) & later)
+
+
+def _note_columns(fields=NOTE_FIELDS):
+    """Core columns of the notes table for `fields`, in order"""
+    return [Note.__table__.c[f] for f in fields]
+
+
+def _make_etag(*parts):
+    """Strong ETag value from the parts that determine a representation"""
+    import hashlib
+    return hashlib.sha1(':'.join(str(p) for p in parts).encode()).hexdigest()
+
+
+def _not_modified(etag):
+    """304 response if the client's If-None-Match already has `etag`, else None"""
+    if request.if_none_match.contains(etag):
+        response = make_response('', 304)
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    return None
+
+
+def _with_etag(response, etag):
+    response.set_etag(etag)
+    # always revalidate, so browsers send If-None-Match and get a 304 for unchanged data
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def _has_tag(tag):
+    """Exact tag match through the note_tags index"""
+    note_tags = NoteTag.__table__
+    return Note.__table__.c.id.in_(select(note_tags.c.note_id).where(note_tags.c.tag == tag.strip()))
+
+
 @note_bp.route('/notes', methods=['GET'])
+@read_replica
 def get_notes():
-    """Get all notes, ordered by saved position (if present), fallback to updated_at desc"""
-    from sqlalchemy import nulls_last, asc, desc
-    notes = Note.query.order_by(nulls_last(asc(Note.position)), desc(Note.updated_at)).all()
-    return jsonify([note.to_dict() for note in notes])
+    """Get notes, ordered by saved position (if present), fallback to updated_at desc.
+    Optional query params:
+      limit  - page size (at most MAX_PAGE_SIZE); the next page cursor is sent in the X-Next-Cursor header
+      cursor - value of X-Next-Cursor from the previous page
+      fields - comma separated subset of NOTE_FIELDS, plus `preview` for a truncated content
+    Without `limit` all notes are returned, as before.
+    The X-Sync-Cursor header can be passed as `since` to GET /api/notes/changes to fetch later changes.
+    Responses carry an ETag built from the change counter, which every note write (including reorders and deletes)
+    moves on; a matching If-None-Match gets a 304 after that single-row read.
+    """
+    from sqlalchemy import func
+
+    # read before the notes, so changes committed in between are sent again by the next sync rather than missed
+    sync_cursor = current_change_seq()
+    etag = _make_etag('notes', sync_cursor, request.query_string.decode())
+    not_modified = _not_modified(etag)
+    if not_modified:
+        return not_modified
+
+    fields = list(NOTE_FIELDS)
+    if request.args.get('fields'):
+        fields = list(dict.fromkeys(f.strip() for f in request.args['fields'].split(',') if f.strip()))
+        unknown = [f for f in fields if f not in NOTE_FIELDS and f != 'preview']
+        if unknown:
+            return jsonify({'error': f"Unknown fields: {', '.join(unknown)}"}), 400
+
+    limit = None
+    if request.args.get('limit'):
+        try:
+            limit = int(request.args['limit'])
+        except ValueError:
+            return jsonify({'error': 'limit must be an integer'}), 400
+        if limit < 1:
+            return jsonify({'error': 'limit must be positive'}), 400
+        limit = min(limit, MAX_PAGE_SIZE)
+
+    # plain Core columns (rows are serialized directly, no Note objects); the sort key is always selected,
+    # after the requested fields, so the last row of a page can be turned into a cursor
+    c = Note.__table__.c
+    columns = {}
+    for field in fields:
+        if field == 'preview':
+            columns['preview'] = func.substr(c.content, 1, PREVIEW_LENGTH).label('preview')
+        else:
+            columns[field] = c[field]
+    for key in ('id', 'position', 'updated_at'):
+        columns.setdefault(key, c[key])
+
+    stmt = select(*columns.values())
+    if request.args.get('cursor'):
+        try:
+            stmt = stmt.where(_after_cursor(_decode_cursor(request.args['cursor'])))
+        except Exception:
+            return jsonify({'error': 'Invalid cursor'}), 400
+    stmt = stmt.order_by(*list_order())
+
+    next_cursor = None
+    if limit is None:
+        rows = db.session.execute(stmt).all()
+    else:
+        rows = db.session.execute(stmt.limit(limit + 1)).all()
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = _encode_cursor(rows[-1])
+
+    response = json_response(serialize_rows(rows, fields))
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    response.headers['X-Sync-Cursor'] = str(sync_cursor)
+    return _with_etag(response, etag)
+
+
+@note_bp.route('/notes/changes', methods=['GET'])
+def get_note_changes():
+    """Delta sync: notes created or updated (including moved), and ids of notes deleted, since a cursor.
+    ?since=<cursor> comes from a previous response (or the X-Sync-Cursor header of GET /api/notes);
+    without it, or with a cursor from an older version (a timestamp), every note is returned.
+    The cursor is the change counter (next_change_seq()), which numbers writes in commit order, so a write that
+    commits long after it started is still picked up. Returns: { "notes": [...], "deleted": [ids], "cursor": "..." };
+    clients should apply the notes as upserts.
+    """
+    from sqlalchemy import exists
+    cursor = current_change_seq()
+    notes = Note.__table__
+    stmt = select(*_note_columns())
+    deleted = []
+    try:
+        since = int(request.args.get('since') or '')
+    except ValueError:
+        since = None
+    if since is not None:
+        stmt = stmt.where(notes.c.change_seq > since, notes.c.change_seq <= cursor)
+        # ids can be reused by SQLite, so skip tombstones of ids that exist again
+        deleted = [note_id for (note_id,) in db.session.query(NoteTombstone.note_id).filter(
+            NoteTombstone.change_seq > since, NoteTombstone.change_seq <= cursor,
+            ~exists().where(Note.id == NoteTombstone.note_id))]
+    rows = db.session.execute(stmt.order_by(notes.c.change_seq, notes.c.id)).all()
+    return json_response({'notes': serialize_rows(rows, NOTE_FIELDS), 'deleted': deleted, 'cursor': str(cursor)})
 
 @note_bp.route('/notes', methods=['POST'])
 def create_note():
@@ -19,14 +201,10 @@ def create_note():
         data = request.json
         if not data or 'title' not in data or 'content' not in data:
             return jsonify({'error': 'Title and content are required'}), 400
+        if len(str(data['title'])) > TITLE_MAX_LENGTH:
+            return jsonify({'error': f'title must be at most {TITLE_MAX_LENGTH} characters'}), 400
         
         # handle optional fields: tags (list or comma string), event_date (YYYY-MM-DD), event_time (HH:MM:SS)
-        tags = data.get('tags')
-        if isinstance(tags, list):
-            tags_value = ','.join([t.strip() for t in tags if t is not None])
-        else:
-            tags_value = tags or None
-
         event_date = None
         if data.get('event_date'):
             from datetime import date
@@ -43,11 +221,11 @@ def create_note():
             except Exception:
                 return jsonify({'error': 'event_time must be in HH:MM:SS format'}), 400
 
-        note = Note(title=data['title'], content=data['content'], tags=tags_value, event_date=event_date, event_time=event_time)
+        note = Note(title=data['title'], content=data['content'], event_date=event_date, event_time=event_time,
+                    change_seq=next_change_seq())
+        note.set_tags(data.get('tags'))
         # assign position to end
-        from sqlalchemy import func
-        max_pos = db.session.query(func.max(Note.position)).scalar()
-        note.position = (max_pos or 0) + 1
+        note.position = next_position()
         db.session.add(note)
         db.session.commit()
         return jsonify(note.to_dict()), 201
@@ -56,30 +234,38 @@ def create_note():
         return jsonify({'error': str(e)}), 500
 
 @note_bp.route('/notes/<int:note_id>', methods=['GET'])
+@read_replica
 def get_note(note_id):
-    """Get a specific note by ID"""
+    """Get a specific note by ID. Supports If-None-Match with an ETag derived from change_seq and updated_at."""
+    row = db.session.query(Note.change_seq, Note.updated_at).filter(Note.id == note_id).first()
+    if row is None:
+        abort(404)
+    etag = _make_etag('note', note_id, row.change_seq, row.updated_at.isoformat() if row.updated_at else '')
+    not_modified = _not_modified(etag)
+    if not_modified:
+        return not_modified
     note = Note.query.get_or_404(note_id)
-    return jsonify(note.to_dict())
+    return _with_etag(jsonify(note.to_dict()), etag)
 
 @note_bp.route('/notes/<int:note_id>', methods=['PUT'])
 def update_note(note_id):
     """Update a specific note"""
     try:
         note = Note.query.get_or_404(note_id)
+        note.change_seq = next_change_seq()
         data = request.json
         
         if not data:
             return jsonify({'error': 'No data provided'}), 400
+        if len(str(data.get('title', ''))) > TITLE_MAX_LENGTH:
+            return jsonify({'error': f'title must be at most {TITLE_MAX_LENGTH} characters'}), 400
         
         note.title = data.get('title', note.title)
         note.content = data.get('content', note.content)
+        note.version = Note.version + 1
         # tags
         if 'tags' in data:
-            tags = data.get('tags')
-            if isinstance(tags, list):
-                note.tags = ','.join([t.strip() for t in tags if t is not None])
-            else:
-                note.tags = tags or None
+            note.set_tags(data.get('tags'))
         # event_date
         if 'event_date' in data:
             if data.get('event_date'):
@@ -106,12 +292,305 @@ def update_note(note_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+def _parse_note_fields(data):
+    """Column values for the note fields present in `data` (tags normalized, dates parsed).
+    Raises ValueError with a client-facing message for invalid values.
+    """
+    from datetime import date, time
+    values = {}
+    for field in ('title', 'content'):
+        if field in data:
+            if not isinstance(data[field], str):
+                raise ValueError(f'{field} must be a string')
+            values[field] = data[field]
+    # checked here: PostgreSQL rejects an over-long varchar, which would fail the whole statement
+    if len(values.get('title', '')) > TITLE_MAX_LENGTH:
+        raise ValueError(f'title must be at most {TITLE_MAX_LENGTH} characters')
+    if 'tags' in data:
+        if data['tags'] is not None and not isinstance(data['tags'], (list, str)):
+            raise ValueError('tags must be a list or a comma-separated string')
+        values['tags'] = ','.join(split_tags(data['tags'])) or None
+    if 'event_date' in data:
+        try:
+            values['event_date'] = date.fromisoformat(data['event_date']) if data['event_date'] else None
+        except Exception:
+            raise ValueError('event_date must be in YYYY-MM-DD format')
+    if 'event_time' in data:
+        try:
+            values['event_time'] = time.fromisoformat(data['event_time']) if data['event_time'] else None
+        except Exception:
+            raise ValueError('event_time must be in HH:MM:SS format')
+    return values
+
+
+def _replace_tag_rows(tags_by_note):
+    """Rewrite note_tags for {note_id: tags string or None} with one DELETE and one multi-row INSERT"""
+    from sqlalchemy import delete, insert
+    note_tags = NoteTag.__table__
+    db.session.execute(delete(note_tags).where(note_tags.c.note_id.in_(list(tags_by_note))))
+    rows = [{'note_id': note_id, 'tag': tag} for note_id, tags in tags_by_note.items() for tag in split_tags(tags)]
+    if rows:
+        db.session.execute(insert(note_tags), rows)
+
+
+@note_bp.route('/notes/<int:note_id>', methods=['PATCH'])
+def patch_note(note_id):
+    """Partially update a note with a single UPDATE ... WHERE id = ? [AND version = ?], without loading it first.
+    Expects JSON with only the changed fields (title, content, tags, event_date, event_time), plus optionally
+    "version": the version the client last saw. If the note's content has changed since, nothing is written and 409
+    is returned with the current version. Reordering does not change the version.
+    Returns: { "id": ..., "updated_at": "...", "version": n }
+    """
+    from sqlalchemy import update
+    try:
+        data = request.json
+        if not data or not isinstance(data, dict):
+            return jsonify({'error': 'No data provided'}), 400
+        try:
+            values = _parse_note_fields(data)
+            expected = data.get('version')
+            if expected is not None and (not isinstance(expected, int) or isinstance(expected, bool)):
+                raise ValueError('version must be an integer')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if not values:
+            return jsonify({'error': 'No fields to update'}), 400
+
+        notes = Note.__table__
+        values['updated_at'] = datetime.utcnow()
+        values['change_seq'] = next_change_seq()
+        stmt = (update(notes).where(notes.c.id == note_id)
+                .values(**values, version=notes.c.version + 1).returning(notes.c.version))
+        if expected is not None:
+            stmt = stmt.where(notes.c.version == expected)
+        version = db.session.execute(stmt).scalar()
+        if version is None:
+            db.session.rollback()
+            current = db.session.query(Note.version, Note.updated_at).filter(Note.id == note_id).first()
+            if current is None:
+                return jsonify({'error': 'Note not found'}), 404
+            return jsonify({
+                'error': 'Note was modified by someone else',
+                'version': current.version,
+                'updated_at': current.updated_at.isoformat() if current.updated_at else None
+            }), 409
+        if 'tags' in values:
+            _replace_tag_rows({note_id: values['tags']})
+        db.session.commit()
+        return jsonify({'id': note_id, 'updated_at': values['updated_at'].isoformat(), 'version': version})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+
+def _parse_new_note(data):
+    """Column values for a note to be created; title and content are required"""
+    if not isinstance(data.get('title'), str) or not isinstance(data.get('content'), str):
+        raise ValueError('Title and content are required')
+    return _parse_note_fields(data)
+
+
+def _chunks(items, size=BATCH_CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _insert_notes(rows):
+    """Insert notes given as column values (title and content required) and return their new ids in order.
+    Positions are appended after the last note from one MAX(position) read; note_tags rows are written too.
+    """
+    from sqlalchemy import insert
+    notes = Note.__table__
+    now = datetime.utcnow()
+    seq = next_change_seq()
+    for row, position in zip(rows, reserve_positions(len(rows))):
+        row.setdefault('tags', None)
+        row.setdefault('event_date', None)
+        row.setdefault('event_time', None)
+        row.update(position=position, created_at=now, updated_at=now, change_seq=seq)
+    # RETURNING rows of a multi-row insert come back in no particular order; positions are unique, so map by them
+    stmt = insert(notes).returning(notes.c.id, notes.c.position)
+    id_by_position = {}
+    for chunk in _chunks(rows):
+        id_by_position.update((r.position, r.id) for r in db.session.execute(stmt, chunk))
+    ids = [id_by_position[row['position']] for row in rows]
+    tag_rows = [{'note_id': note_id, 'tag': tag} for note_id, row in zip(ids, rows) for tag in split_tags(row['tags'])]
+    for chunk in _chunks(tag_rows):
+        db.session.execute(insert(NoteTag.__table__), chunk)
+    return ids
+
+
+def _existing_note_ids(ids):
+    notes = Note.__table__
+    found = set()
+    for chunk in _chunks(list(set(ids))):
+        found.update(db.session.execute(select(notes.c.id).where(notes.c.id.in_(chunk))).scalars())
+    return found
+
+
+@note_bp.route('/notes/batch', methods=['POST'])
+def batch_notes():
+    """Apply many create/update/delete operations in one transaction with bulk statements.
+    Expects JSON: { "operations": [
+        {"op": "create", "title": "...", "content": "...", "tags": [...], "event_date": ..., "event_time": ...},
+        {"op": "update", "id": 1, <any of the fields above>},
+        {"op": "delete", "id": 2} ] }
+    Creates are applied first, then updates, then deletes. If any operation is invalid nothing is written and
+    400 lists the invalid ones. Otherwise returns { "results": [{"index", "op", "status", "id"}] } in request order,
+    with status created, updated, deleted or not_found.
+    """
+    from sqlalchemy import update, delete, insert, bindparam
+    data = request.json
+    operations = data.get('operations') if isinstance(data, dict) else None
+    if not isinstance(operations, list) or not operations:
+        return jsonify({'error': 'operations must be a non-empty list'}), 400
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        return jsonify({'error': f'At most {MAX_BATCH_OPERATIONS} operations per batch'}), 400
+
+    creates, updates, deletes, invalid = [], [], [], []
+    for index, item in enumerate(operations):
+        op = item.get('op') if isinstance(item, dict) else None
+        try:
+            if op not in ('create', 'update', 'delete'):
+                raise ValueError('op must be create, update or delete')
+            # bool is a subclass of int, but true/false are not note ids
+            if op != 'create' and (not isinstance(item.get('id'), int) or isinstance(item['id'], bool)):
+                raise ValueError('id must be an integer')
+            if op == 'create':
+                creates.append((index, _parse_new_note(item)))
+            elif op == 'update':
+                values = _parse_note_fields(item)
+                if not values:
+                    raise ValueError('No fields to update')
+                updates.append((index, item['id'], values))
+            else:
+                deletes.append((index, item['id']))
+        except ValueError as e:
+            invalid.append({'index': index, 'status': 'error', 'error': str(e)})
+    if invalid:
+        return jsonify({'error': 'Invalid operations', 'results': invalid}), 400
+
+    results = [None] * len(operations)
+    notes = Note.__table__
+    try:
+        seq = next_change_seq()
+        if creates:
+            ids = _insert_notes([values for _, values in creates])
+            for (index, _), note_id in zip(creates, ids):
+                results[index] = {'index': index, 'op': 'create', 'status': 'created', 'id': note_id}
+
+        existing = _existing_note_ids([note_id for _, note_id, _ in updates] + [note_id for _, note_id in deletes])
+        now = datetime.utcnow()
+        # one executemany per distinct set of changed fields
+        groups = {}
+        for index, note_id, values in updates:
+            found = note_id in existing
+            results[index] = {'index': index, 'op': 'update', 'status': 'updated' if found else 'not_found', 'id': note_id}
+            if found:
+                groups.setdefault(tuple(sorted(values)), []).append(dict(values, _id=note_id, updated_at=now, change_seq=seq))
+        tags_by_note = {}
+        for keys, params in groups.items():
+            stmt = update(notes).where(notes.c.id == bindparam('_id')).values(
+                dict({key: bindparam(key) for key in keys + ('updated_at', 'change_seq')}, version=notes.c.version + 1))
+            for chunk in _chunks(params):
+                db.session.execute(stmt, chunk)
+            if 'tags' in keys:
+                tags_by_note.update((p['_id'], p['tags']) for p in params)
+        for chunk in _chunks(list(tags_by_note.items())):
+            _replace_tag_rows(dict(chunk))
+
+        deleted_ids = []
+        for index, note_id in deletes:
+            found = note_id in existing
+            results[index] = {'index': index, 'op': 'delete', 'status': 'deleted' if found else 'not_found', 'id': note_id}
+            if found and note_id not in deleted_ids:
+                deleted_ids.append(note_id)
+        tombstones = NoteTombstone.__table__
+        for chunk in _chunks(deleted_ids):
+            db.session.execute(delete(NoteTag.__table__).where(NoteTag.__table__.c.note_id.in_(chunk)))
+            db.session.execute(delete(notes).where(notes.c.id.in_(chunk)))
+            # leave tombstones for delta sync clients
+            db.session.execute(delete(tombstones).where(tombstones.c.note_id.in_(chunk)))
+            db.session.execute(insert(tombstones),
+                               [{'note_id': note_id, 'deleted_at': now, 'change_seq': seq} for note_id in chunk])
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+    return jsonify({'results': results})
+
+
+@note_bp.route('/notes/export', methods=['GET'])
+@read_replica
+def export_notes():
+    """Stream every note as NDJSON (one Note.to_dict() object per line), in id order.
+    Rows are read through a server-side cursor EXPORT_CHUNK_SIZE at a time, so memory does not grow with the table.
+    """
+    from flask import Response, stream_with_context
+
+    def lines():
+        result = db.session.execute(
+            select(*_note_columns()).order_by(Note.id).execution_options(yield_per=EXPORT_CHUNK_SIZE))
+        try:
+            for rows in result.partitions():
+                yield b''.join(dumps(item) + b'\n' for item in serialize_rows(rows, NOTE_FIELDS))
+        finally:
+            result.close()
+
+    response = Response(stream_with_context(lines()), mimetype='application/x-ndjson')
+    response.headers['Content-Disposition'] = 'attachment; filename=notes.ndjson'
+    return response
+
+
+@note_bp.route('/notes/import', methods=['POST'])
+def import_notes():
+    """Create notes from an NDJSON body (one note object per line, as written by the export), appended to the list.
+    The body is read line by line and inserted IMPORT_CHUNK_SIZE notes per commit; ids, positions and timestamps
+    in the input are ignored. Invalid lines are skipped.
+    Returns: { "imported": n, "failed": n, "errors": [{"line": n, "error": "..."}] }
+    """
+    import json
+    imported, failed, errors = 0, 0, []
+    chunk = []
+
+    def flush():
+        ids = _insert_notes(chunk)
+        db.session.commit()
+        chunk.clear()
+        return len(ids)
+
+    try:
+        for number, line in enumerate(request.stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+                if not isinstance(item, dict):
+                    raise ValueError('Each line must be a JSON object')
+                chunk.append(_parse_new_note(item))
+            except ValueError as e:
+                failed += 1
+                if len(errors) < MAX_IMPORT_ERRORS:
+                    errors.append({'line': number, 'error': str(e)})
+                continue
+            if len(chunk) >= IMPORT_CHUNK_SIZE:
+                imported += flush()
+        if chunk:
+            imported += flush()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e), 'imported': imported}), 500
+    return jsonify({'imported': imported, 'failed': failed, 'errors': errors})
+
+
 @note_bp.route('/notes/<int:note_id>', methods=['DELETE'])
 def delete_note(note_id):
     """Delete a specific note"""
     try:
         note = Note.query.get_or_404(note_id)
         db.session.delete(note)
+        # leave a tombstone for delta sync clients
+        db.session.merge(NoteTombstone(note_id=note_id, deleted_at=datetime.utcnow(), change_seq=next_change_seq()))
         db.session.commit()
         return '', 204
     except Exception as e:
@@ -119,39 +598,68 @@ def delete_note(note_id):
         return jsonify({'error': str(e)}), 500
 
 @note_bp.route('/notes/search', methods=['GET'])
+@read_replica
 def search_notes():
-    """Search notes by title or content"""
+    """Full-text search over title and content, best matches first.
+    Each result is a note plus `rank`, `title_highlight` and `snippet`: HTML-escaped text with the matches wrapped
+    in <mark>. Optional: ?tag=tagname (exact tag match, also usable without q), ?limit=N
+    """
+    from src.search import search_statement, render_highlights
     query = request.args.get('q', '')
-    if not query:
-        return jsonify([])
-    
-    # support searching by title/content and by tag via ?tag=tagname
     tag = request.args.get('tag')
-    q = Note.query
-    if query:
-        q = q.filter((Note.title.contains(query)) | (Note.content.contains(query)))
+    if not query and not tag:
+        return jsonify([])
+
+    try:
+        limit = min(int(request.args.get('limit', 50)), MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+
+    if not query:
+        # tag-only lookup, served by the note_tags index
+        rows = db.session.execute(
+            select(*_note_columns()).where(_has_tag(tag)).order_by(Note.__table__.c.updated_at.desc()).limit(limit)).all()
+        return json_response(serialize_rows(rows, NOTE_FIELDS))
+
+    filters = []
     if tag:
-        # simple contains on comma-separated tags
-        q = q.filter(Note.tags.contains(tag))
-    notes = q.order_by(Note.updated_at.desc()).all()
-    
-    return jsonify([note.to_dict() for note in notes])
+        filters.append(_has_tag(tag))
+
+    stmt = search_statement(db.engine, query, _note_columns(), limit, filters)
+    if stmt is None:
+        return jsonify([])
+    rows = db.session.execute(stmt).all()
+    return json_response(render_highlights(serialize_rows(rows, NOTE_FIELDS + ('rank', 'title_highlight', 'snippet'))))
 
 
 @note_bp.route('/notes/reorder', methods=['POST'])
 def reorder_notes():
-    """Persist new order of notes. Expects JSON: { "order": [id1, id2, ...] }"""
+    """Persist new order of notes. Expects JSON, either
+    { "order": [id1, id2, ...] } to set the whole order (a few batched UPDATEs), or
+    { "id": X, "after": Y } to move one note after Y (after null/missing = to the top), touching O(1) rows.
+    """
     try:
         data = request.json or {}
+        # taken first: it also queues concurrent reorders, which read positions before writing them
+        next_change_seq()
+        if 'id' in data:
+            note_id = data.get('id')
+            after_id = data.get('after')
+            if not isinstance(note_id, int) or (after_id is not None and not isinstance(after_id, int)):
+                return jsonify({'error': 'id and after must be note ids'}), 400
+            if note_id == after_id:
+                return jsonify({'error': 'cannot move a note after itself'}), 400
+            position = move_note(note_id, after_id)
+            if position is None:
+                return jsonify({'error': 'Note not found'}), 404
+            db.session.commit()
+            return jsonify({'status': 'ok', 'id': note_id, 'position': position}), 200
+
         order = data.get('order')
         if not order or not isinstance(order, list):
             return jsonify({'error': 'order must be a list of note ids'}), 400
 
-        # update positions
-        for idx, note_id in enumerate(order, start=1):
-            n = Note.query.get(note_id)
-            if n:
-                n.position = idx
+        renumber_positions(order)
         db.session.commit()
         return jsonify({'status': 'ok'}), 200
     except Exception as e:
@@ -159,41 +667,142 @@ def reorder_notes():
         return jsonify({'error': str(e)}), 500
 
 
+def _sse(event, data):
+    """Format one server-sent event"""
+    import json
+    return f'event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n'
+
+
+def _sse_response(events):
+    """Stream an event generator to the client as it is produced"""
+    from flask import Response, stream_with_context
+    response = Response(stream_with_context(events), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # ask proxies such as nginx not to buffer the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def _job_accepted(job):
+    """202 response pointing the client at the job status endpoint"""
+    response = jsonify({'job_id': job.id, 'status': job.status, 'status_url': f'/api/jobs/{job.id}'})
+    response.status_code = 202
+    response.headers['Location'] = f'/api/jobs/{job.id}'
+    return response
+
+
 @note_bp.route('/notes/<int:note_id>/translate', methods=['POST'])
 def translate_note(note_id):
     """Translate a note's title and content into a target language using the project's LLM helper.
+    Runs as a background job; title and content go to the model in a single request.
     Expects JSON: { "target_language": "Chinese" }
-    Returns: { "title": "...", "content": "..." }
+    Returns 202 with a job id; the job result is { "title": "...", "content": "..." }
     """
     try:
-        note = Note.query.get_or_404(note_id)
+        if db.session.query(Note.id).filter(Note.id == note_id).first() is None:
+            return jsonify({'error': 'Note not found'}), 404
         data = request.json or {}
         target = data.get('target_language') or data.get('language') or 'English'
+        return _job_accepted(submit_job('translate_note', {'note_id': note_id, 'target_language': target}))
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
 
-        # Translate title and content separately
-        translated_title = ''
-        translated_content = ''
-        try:
-            translated_title = translate_to_language(note.title or '', target) if (note.title or '').strip() else ''
-        except Exception:
-            translated_title = ''
 
+@note_bp.route('/notes/<int:note_id>/translate/stream', methods=['POST'])
+def translate_note_stream(note_id):
+    """Streaming variant of translate_note: relays the translation over server-sent events.
+    Title and content go to the model in a single streamed request.
+    Expects JSON: { "target_language": "Chinese" }
+    Events: `delta` { "field": "title" | "content", "delta": "..." } as the text arrives,
+    then `done` { "title", "content" }, or `error`.
+    """
+    note = db.session.get(Note, note_id)
+    if note is None:
+        return jsonify({'error': 'Note not found'}), 404
+    data = request.json or {}
+    target = data.get('target_language') or data.get('language') or 'English'
+    fields = {'title': note.title or '', 'content': note.content or ''}
+    # release the DB connection before streaming
+    db.session.close()
+
+    def events():
+        from src.llm import stream_translate_fields
+        parts = {field: [] for field in fields}
         try:
-            translated_content = translate_to_language(note.content or '', target) if (note.content or '').strip() else ''
+            for field, delta in stream_translate_fields(fields, target):
+                parts[field].append(delta)
+                yield _sse('delta', {'field': field, 'delta': delta})
+            yield _sse('done', {field: ''.join(p).strip() for field, p in parts.items()})
         except Exception as e:
-            # if content translation fails, include error message in response
-            return jsonify({'error': f'Content translation failed: {str(e)}'}), 500
+            yield _sse('error', {'error': f'Translation failed: {str(e)}'})
 
-        return jsonify({'title': translated_title, 'content': translated_content}), 200
+    return _sse_response(events())
+
+
+@job_handler('translate_note')
+def _translate_note_job(payload):
+    from src.llm import translate_fields
+    note = db.session.get(Note, payload['note_id'])
+    if note is None:
+        raise ValueError('Note not found')
+    title, content = note.title or '', note.content or ''
+    # release the DB connection before the (slow) model call
+    db.session.close()
+    translated = translate_fields({'title': title, 'content': content}, payload['target_language'])
+    return {'title': translated['title'], 'content': translated['content']}
+
+
+@note_bp.route('/notes/translate', methods=['POST'])
+def translate_notes_bulk():
+    """Translate several notes at once, as a background job.
+    Expects JSON: { "ids": [1, 2, ...], "target_language": "Chinese" } (at most MAX_BULK_TRANSLATE ids)
+    Returns 202 with a job id; the job result is
+    { "results": [{ "id", "title", "content" }], "errors": [{ "id", "error" }], "missing": [ids] }
+    """
+    data = request.json or {}
+    ids = data.get('ids')
+    target = data.get('target_language') or data.get('language') or 'English'
+    if not ids or not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+        return jsonify({'error': 'ids must be a list of note ids'}), 400
+    if len(ids) > MAX_BULK_TRANSLATE:
+        return jsonify({'error': f'at most {MAX_BULK_TRANSLATE} notes per request'}), 400
+    try:
+        return _job_accepted(submit_job('translate_notes', {'ids': ids, 'target_language': target}))
     except Exception as e:
+        db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 
+@job_handler('translate_notes')
+def _translate_notes_job(payload):
+    from src.llm import translate_notes
+    ids = payload['ids']
+    rows = db.session.query(Note.id, Note.title, Note.content).filter(Note.id.in_(ids)).all()
+    db.session.close()
+    found = {row.id: row for row in rows}
+    translated, errors = translate_notes(
+        [{'id': row.id, 'title': row.title, 'content': row.content} for row in rows], payload['target_language'])
+
+    results = []
+    failed = []
+    for note_id in dict.fromkeys(ids):
+        if note_id not in found:
+            continue
+        if str(note_id) in errors:
+            failed.append({'id': note_id, 'error': errors[str(note_id)]})
+        else:
+            fields = translated.get(str(note_id), {})
+            results.append({'id': note_id, 'title': fields.get('title', ''), 'content': fields.get('content', '')})
+    missing = [i for i in dict.fromkeys(ids) if i not in found]
+    return {'results': results, 'errors': failed, 'missing': missing}
+
+
 @note_bp.route('/notes/generate', methods=['POST'])
 def generate_note():
-    """Generate a structured note from a natural language prompt using the LLM.
+    """Generate a structured note from a natural language prompt using the LLM, as a background job.
     Expects JSON: { "prompt": "meeting tomorrow 3pm", "language": "English" }
-    Returns created note object.
+    Returns 202 with a job id; the job result is the created note object.
     """
     try:
         data = request.json or {}
@@ -203,45 +812,76 @@ def generate_note():
         if not user_prompt or not user_prompt.strip():
             return jsonify({'error': 'prompt is required'}), 400
 
-        # call LLM to extract structured note
-        llm_raw = extract_structured_notes(user_prompt, lang=lang)
-
-        # try to parse JSON from LLM raw response
-        import json, re
-        parsed = None
-        try:
-            parsed = json.loads(llm_raw)
-        except Exception:
-            m = re.search(r"\{[\s\S]*\}", llm_raw)
-            if m:
-                try:
-                    parsed = json.loads(m.group(0))
-                except Exception:
-                    parsed = None
-
-        if not parsed:
-            return jsonify({'error': 'LLM did not return valid JSON', 'raw': llm_raw}), 500
-
-        # Extract fields with fallback keys
-        title = parsed.get('Title') or parsed.get('title') or parsed.get('Title'.lower(), 'Untitled')
-        content = parsed.get('Notes') or parsed.get('notes') or parsed.get('Notes'.lower(), '')
-        tags = parsed.get('Tags') or parsed.get('tags') or []
-        tags_value = None
-        if isinstance(tags, list):
-            tags_value = ','.join([t.strip() for t in tags if t])
-        elif isinstance(tags, str):
-            tags_value = tags
-
-        # create and persist note
-        from sqlalchemy import func
-        max_pos = db.session.query(func.max(Note.position)).scalar()
-        note = Note(title=title or 'Untitled', content=content or '', tags=tags_value)
-        note.position = (max_pos or 0) + 1
-        db.session.add(note)
-        db.session.commit()
-
-        return jsonify(note.to_dict()), 201
+        return _job_accepted(submit_job('generate_note', {'prompt': user_prompt, 'language': lang}))
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+
+@note_bp.route('/notes/generate/stream', methods=['POST'])
+def generate_note_stream():
+    """Streaming variant of generate_note: relays the model output over server-sent events.
+    Expects JSON: { "prompt": "...", "language": "English" }
+    Events: `delta` { "delta": "..." } while the model writes, then `done` with the created note, or `error`.
+    """
+    data = request.json or {}
+    user_prompt = data.get('prompt') or data.get('text') or ''
+    lang = data.get('language') or data.get('lang') or 'English'
+    if not user_prompt or not user_prompt.strip():
+        return jsonify({'error': 'prompt is required'}), 400
+    db.session.close()
+
+    def events():
+        from src.llm import stream_structured_notes
+        try:
+            parts = []
+            for delta in stream_structured_notes(user_prompt, lang=lang):
+                parts.append(delta)
+                yield _sse('delta', {'delta': delta})
+            yield _sse('done', _create_generated_note(''.join(parts)).to_dict())
+        except Exception as e:
+            db.session.rollback()
+            yield _sse('error', {'error': str(e)})
+
+    return _sse_response(events())
+
+
+@job_handler('generate_note')
+def _generate_note_job(payload):
+    from src.llm import extract_structured_notes
+    # call LLM to extract structured note
+    llm_raw = extract_structured_notes(payload['prompt'], lang=payload['language'])
+    return _create_generated_note(llm_raw).to_dict()
+
+
+def _create_generated_note(llm_raw):
+    """Parse the model's JSON answer and persist it as a new note"""
+    from src.llm import parse_json_response
+    # try to parse JSON from LLM raw response
+    parsed = parse_json_response(llm_raw)
+
+    if not parsed or not isinstance(parsed, dict):
+        raise ValueError(f'LLM did not return valid JSON: {llm_raw}')
+
+    # Extract fields with fallback keys
+    title = parsed.get('Title') or parsed.get('title') or parsed.get('Title'.lower(), 'Untitled')
+    content = parsed.get('Notes') or parsed.get('notes') or parsed.get('Notes'.lower(), '')
+    tags = parsed.get('Tags') or parsed.get('tags') or []
+
+    # create and persist note
+    note = Note(title=title or 'Untitled', content=content or '', change_seq=next_change_seq())
+    note.set_tags(tags)
+    note.position = next_position()
+    db.session.add(note)
+    db.session.commit()
+    return note
+
+
+@note_bp.route('/tags', methods=['GET'])
+@read_replica
+def get_tags():
+    """List tags with the number of notes using each, most used first"""
+    from sqlalchemy import func
+    count = func.count(NoteTag.note_id)
+    rows = db.session.query(NoteTag.tag, count).group_by(NoteTag.tag).order_by(count.desc(), NoteTag.tag).all()
+    return jsonify([{'tag': tag, 'count': n} for tag, n in rows])
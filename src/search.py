@@ -0,0 +1,162 @@
+"""Full-text search backend for notes.
+
+SQLite: an external-content FTS5 table (notes_fts) kept in sync with `notes` by triggers.
+PostgreSQL: a GIN expression index over the weighted tsvector of title and content (no extra column, so it can be
+built with CREATE INDEX CONCURRENTLY without rewriting or locking the table).
+Anything else (or a SQLite build without FTS5) falls back to LIKE scans.
+"""
+import html
+import re
+from sqlalchemy import text, select, func, literal_column, table, column
+from src.models.note import Note
+
+# matches are marked with private-use characters in SQL, so render_highlights() can HTML-escape the note text
+# around them before turning them into <mark> tags
+HIGHLIGHT_START = '\ue000'
+HIGHLIGHT_END = '\ue001'
+SNIPPET_WORDS = 16
+
+# backend detected per database url: 'fts5', 'tsvector' or None
+_backends = {}
+
+_SQLITE_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(
+        title, content, content='notes', content_rowid='id', tokenize='unicode61 remove_diacritics 2')""",
+    """CREATE TRIGGER IF NOT EXISTS notes_fts_ai AFTER INSERT ON notes BEGIN
+        INSERT INTO notes_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS notes_fts_ad AFTER DELETE ON notes BEGIN
+        INSERT INTO notes_fts(notes_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+    END""",
+    # only title/content changes touch the index, so reorders stay cheap
+    """CREATE TRIGGER IF NOT EXISTS notes_fts_au AFTER UPDATE OF title, content ON notes BEGIN
+        INSERT INTO notes_fts(notes_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO notes_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END""",
+]
+
+# the indexed expression; queries must use exactly this expression for PostgreSQL to use the index
+PG_SEARCH_VECTOR = ("setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+                    "setweight(to_tsvector('simple', coalesce(content, '')), 'B')")
+PG_SEARCH_INDEX = 'ix_notes_fulltext'
+
+
+def install_search_index(conn):
+    """Create the search index for the connection's dialect (idempotent). Returns the backend name or None.
+    Run through the migrations (src/migrations/versions.py); on PostgreSQL `conn` must be in autocommit mode.
+    """
+    from src.migrations import create_index, has_column
+    dialect = conn.dialect.name
+    backend = None
+    if dialect == 'sqlite':
+        exists = conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'notes_fts'")).first()
+        try:
+            conn.execute(text(_SQLITE_DDL[0]))
+        except Exception:
+            # SQLite compiled without FTS5
+            pass
+        else:
+            for ddl in _SQLITE_DDL[1:]:
+                conn.execute(text(ddl))
+            if not exists:
+                # index rows that were written before the table existed
+                conn.execute(text("INSERT INTO notes_fts(notes_fts) VALUES ('rebuild')"))
+            backend = 'fts5'
+    elif dialect == 'postgresql':
+        if has_column(conn, 'notes', 'search_vector'):
+            # replaced by the expression index; dropping a column does not rewrite the table
+            conn.execute(text('DROP INDEX CONCURRENTLY IF EXISTS ix_notes_search_vector'))
+            conn.execute(text('ALTER TABLE notes DROP COLUMN search_vector'))
+        create_index(conn, PG_SEARCH_INDEX, 'notes', f'({PG_SEARCH_VECTOR})', using='GIN')
+        backend = 'tsvector'
+    _backends[str(conn.engine.url)] = backend
+    return backend
+
+
+def search_backend(engine):
+    """Detect which search backend is installed in the engine's database"""
+    key = str(engine.url)
+    if key not in _backends:
+        backend = None
+        with engine.connect() as conn:
+            if engine.dialect.name == 'sqlite':
+                if conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'notes_fts'")).first():
+                    backend = 'fts5'
+            elif engine.dialect.name == 'postgresql':
+                if conn.execute(text("SELECT 1 FROM pg_indexes WHERE indexname = :name"),
+                                {'name': PG_SEARCH_INDEX}).first():
+                    backend = 'tsvector'
+        _backends[key] = backend
+    return _backends[key]
+
+
+def _terms(query):
+    """Split user input into word terms; punctuation is dropped so it can never break the query syntax"""
+    return re.findall(r'\w+', query)
+
+
+def search_statement(engine, query, columns, limit, filters=()):
+    """Build a ranked search select over `columns` (Note columns), restricted by extra `filters`.
+    Each row also has `rank` (higher is better), `title_highlight` and `snippet`.
+    Returns None when the query has no searchable terms.
+    """
+    terms = _terms(query)
+    if not terms:
+        return None
+    backend = search_backend(engine)
+
+    if backend == 'fts5':
+        fts = table('notes_fts', column('rowid'))
+        fts_col = literal_column('notes_fts')
+        # every term must match, each as a prefix so search-as-you-type works
+        match = ' '.join(f'"{t}"*' for t in terms)
+        rank = (-func.bm25(fts_col, 10.0, 1.0)).label('rank')
+        return (
+            select(*columns, rank,
+                   func.highlight(fts_col, 0, HIGHLIGHT_START, HIGHLIGHT_END).label('title_highlight'),
+                   func.snippet(fts_col, 1, HIGHLIGHT_START, HIGHLIGHT_END, '…', SNIPPET_WORDS).label('snippet'))
+            .select_from(fts.join(Note.__table__, Note.id == fts.c.rowid))
+            .where(fts_col.op('MATCH')(match), *filters)
+            .order_by(rank.desc(), Note.updated_at.desc())
+            .limit(limit)
+        )
+
+    if backend == 'tsvector':
+        tsquery = func.to_tsquery('simple', ' & '.join(f'{t}:*' for t in terms))
+        search_vector = literal_column(f'({PG_SEARCH_VECTOR})')
+        rank = func.ts_rank(search_vector, tsquery).label('rank')
+        # rank and cut down to `limit` rows first, so ts_headline only runs on the page
+        page = (
+            select(*columns, rank)
+            .where(search_vector.op('@@')(tsquery), *filters)
+            .order_by(rank.desc(), Note.updated_at.desc())
+            .limit(limit)
+            .subquery()
+        )
+        options = f'StartSel="{HIGHLIGHT_START}", StopSel="{HIGHLIGHT_END}", MaxWords={SNIPPET_WORDS}, MinWords=5'
+        return (
+            select(page,
+                   func.ts_headline('simple', page.c.title, tsquery, 'HighlightAll=true, ' + options).label('title_highlight'),
+                   func.ts_headline('simple', page.c.content, tsquery, options).label('snippet'))
+            .order_by(page.c.rank.desc(), page.c.updated_at.desc())
+        )
+
+    # no index available: LIKE scan without ranking or highlighting
+    return (
+        select(*columns, literal_column('0').label('rank'),
+               Note.title.label('title_highlight'), func.substr(Note.content, 1, 200).label('snippet'))
+        .where(Note.title.contains(query) | Note.content.contains(query), *filters)
+        .order_by(Note.updated_at.desc())
+        .limit(limit)
+    )
+
+
+def render_highlights(items):
+    """HTML-escape `title_highlight` and `snippet` of serialized search results and turn the match markers into
+    <mark> tags, so clients can insert them as HTML"""
+    for item in items:
+        for key in ('title_highlight', 'snippet'):
+            if item.get(key) is not None:
+                item[key] = (html.escape(item[key])
+                             .replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_END, '</mark>'))
+    return items
@@ -0,0 +1,46 @@
+"""Fast JSON encoding for note listings.
+
+List-style endpoints select plain column rows through Core (no Note objects, no identity map), shape them with
+serialize_rows() and encode them with orjson when it is installed, or the stdlib json module otherwise.
+orjson writes date, time and datetime values in the same ISO 8601 form as isoformat(), so they are passed through
+as they come from the database instead of being converted row by row.
+"""
+import json
+from datetime import date, time
+from flask import Response
+
+try:
+    import orjson
+except ImportError:  # optional: pip install orjson
+    orjson = None
+
+
+def serialize_rows(rows, fields):
+    """Dicts in the Note.to_dict() shape, limited to `fields`, from rows whose first columns are `fields` in order.
+    Extra trailing columns (sort keys selected only for the cursor) are ignored.
+    """
+    fields = tuple(fields)
+    items = [dict(zip(fields, row)) for row in rows]
+    if 'tags' in fields:
+        for item in items:
+            tags = item['tags']
+            item['tags'] = [t for t in tags.split(',') if t] if tags else []
+    return items
+
+
+def _default(value):
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def dumps(obj):
+    """Encode to compact JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, default=_default, separators=(',', ':')).encode('utf-8')
+
+
+def json_response(obj, status=200):
+    """Like jsonify(), but encoded with dumps()"""
+    return Response(dumps(obj), status=status, mimetype='application/json')
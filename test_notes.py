@@ -0,0 +1,216 @@
+"""
+Tests for the notes API, each against a fresh SQLite database
+"""
+import os
+import sys
+import threading
+from datetime import datetime
+
+import pytest
+import sqlalchemy as sa
+
+# Add project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'test.db'}")
+    monkeypatch.setenv('AUTO_MIGRATE', 'true')
+    monkeypatch.setenv('GITHUB_TOKEN', 'unused')
+    from src.main import create_app
+    return create_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def create_notes(client, count):
+    ids = []
+    for i in range(count):
+        response = client.post('/api/notes', json={'title': f'note {i}', 'content': 'text'})
+        assert response.status_code == 201
+        ids.append(response.get_json()['id'])
+    return ids
+
+
+def read_pages(client, limit):
+    """Follow X-Next-Cursor through every page; returns the note ids in order"""
+    ids, cursor = [], None
+    for _ in range(100):
+        response = client.get(f'/api/notes?limit={limit}' + (f'&cursor={cursor}' if cursor else ''))
+        assert response.status_code == 200
+        ids += [note['id'] for note in response.get_json()]
+        cursor = response.headers.get('X-Next-Cursor')
+        if not cursor:
+            return ids
+    pytest.fail('pagination did not end')
+
+
+def test_pages_cover_null_and_tied_sort_keys(app, client):
+    ids = create_notes(client, 30)
+    from src.models.user import db
+    from src.models.note import Note
+    notes = Note.__table__
+    with app.app_context():
+        # every combination of tied / NULL positions and tied / NULL updated_at (updated_at last: writing
+        # position alone would bump it)
+        db.session.execute(sa.update(notes).where(notes.c.id % 2 == 0).values(position=None))
+        db.session.execute(sa.update(notes).where(notes.c.id % 5 == 1).values(position=5))
+        db.session.execute(sa.update(notes).where(notes.c.id % 3 == 0).values(updated_at=None))
+        db.session.execute(sa.update(notes).where(notes.c.id % 3 == 1).values(updated_at=datetime(2024, 1, 1)))
+        db.session.commit()
+        rows = db.session.execute(sa.select(notes.c.id, notes.c.position, notes.c.updated_at)).all()
+
+    # position NULLS LAST, updated_at DESC NULLS LAST, id DESC
+    expected = [row.id for row in sorted(rows, key=lambda row: (
+        row.position is None, row.position or 0,
+        row.updated_at is None, -(row.updated_at.timestamp() if row.updated_at else 0), -row.id))]
+    assert sorted(expected) == sorted(ids)
+    assert [note['id'] for note in client.get('/api/notes').get_json()] == expected
+    for limit in (1, 3, 7):
+        assert read_pages(client, limit) == expected
+
+
+def test_concurrent_creates_get_distinct_positions(app, client):
+    errors = []
+
+    def create_single():
+        worker = app.test_client()
+        for i in range(10):
+            response = worker.post('/api/notes', json={'title': f'single {i}', 'content': 'text'})
+            if response.status_code != 201:
+                errors.append(response.get_json())
+
+    def create_batch():
+        worker = app.test_client()
+        operations = [{'op': 'create', 'title': 'batch', 'content': 'text'}] * 5
+        for _ in range(5):
+            response = worker.post('/api/notes/batch', json={'operations': operations})
+            if response.status_code != 200:
+                errors.append(response.get_json())
+
+    threads = [threading.Thread(target=create_single) for _ in range(4)]
+    threads += [threading.Thread(target=create_batch) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    positions = [note['position'] for note in client.get('/api/notes?fields=id,position').get_json()]
+    assert len(positions) == 4 * 10 + 2 * 5 * 5
+    assert None not in positions
+    assert len(set(positions)) == len(positions)
+
+
+def test_patch_with_stale_version_returns_409(client):
+    note = client.post('/api/notes', json={'title': 'draft', 'content': 'text'}).get_json()
+    assert note['version'] == 1
+
+    response = client.patch(f"/api/notes/{note['id']}", json={'title': 'first', 'version': 1})
+    assert response.status_code == 200
+    assert response.get_json()['version'] == 2
+
+    # a second writer that still holds version 1
+    response = client.patch(f"/api/notes/{note['id']}", json={'title': 'second', 'version': 1})
+    assert response.status_code == 409
+    assert response.get_json()['version'] == 2
+    assert client.get(f"/api/notes/{note['id']}").get_json()['title'] == 'first'
+
+    # reordering is not an edit
+    other = client.post('/api/notes', json={'title': 'other', 'content': 'text'}).get_json()
+    assert client.post('/api/notes/reorder', json={'id': note['id'], 'after': other['id']}).status_code == 200
+    response = client.patch(f"/api/notes/{note['id']}", json={'title': 'third', 'version': 2})
+    assert response.status_code == 200
+    assert response.get_json()['version'] == 3
+
+    assert client.patch('/api/notes/999', json={'title': 'missing', 'version': 1}).status_code == 404
+
+
+def test_batch_reports_each_operation(client):
+    keep, remove = create_notes(client, 2)
+
+    response = client.post('/api/notes/batch', json={'operations': [
+        {'op': 'create', 'title': 'new', 'content': 'text', 'tags': ['a']},
+        {'op': 'update', 'id': keep, 'title': 'renamed'},
+        {'op': 'update', 'id': 999, 'title': 'missing'},
+        {'op': 'delete', 'id': remove},
+        {'op': 'delete', 'id': 998},
+    ]})
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert [(r['index'], r['op'], r['status']) for r in results] == [
+        (0, 'create', 'created'), (1, 'update', 'updated'), (2, 'update', 'not_found'),
+        (3, 'delete', 'deleted'), (4, 'delete', 'not_found')]
+    titles = {note['id']: note['title'] for note in client.get('/api/notes').get_json()}
+    assert titles == {keep: 'renamed', results[0]['id']: 'new'}
+
+
+def test_batch_with_invalid_operations_writes_nothing(client):
+    (note_id,) = create_notes(client, 1)
+
+    response = client.post('/api/notes/batch', json={'operations': [
+        {'op': 'create', 'title': 'fine', 'content': 'text'},
+        {'op': 'create', 'title': 'x' * 201, 'content': 'text'},
+        {'op': 'update', 'id': True, 'title': 'bool id'},
+        {'op': 'update', 'id': note_id},
+        {'op': 'move', 'id': note_id},
+        {'op': 'delete', 'id': note_id},
+    ]})
+    assert response.status_code == 400
+    assert [r['index'] for r in response.get_json()['results']] == [1, 2, 3, 4]
+    assert [note['id'] for note in client.get('/api/notes').get_json()] == [note_id]
+
+
+def test_sync_cursor_picks_up_late_commits_and_deletes(app, client):
+    cursor = client.get('/api/notes').headers['X-Sync-Cursor']
+    first, second = create_notes(client, 2)
+    changes = client.get(f'/api/notes/changes?since={cursor}').get_json()
+    assert sorted(note['id'] for note in changes['notes']) == [first, second]
+    cursor = changes['cursor']
+
+    # a writer takes its change number, then commits only after a reader has moved its cursor on;
+    # its updated_at is old, as for a transaction that started long ago
+    from src.models.user import db
+    from src.models.note import Note, next_change_seq
+    numbered, release = threading.Event(), threading.Event()
+
+    def late_writer():
+        with app.app_context():
+            db.session.add(Note(title='late', content='text', updated_at=datetime(2020, 1, 1),
+                                change_seq=next_change_seq()))
+            db.session.flush()
+            numbered.set()
+            release.wait(10)
+            db.session.commit()
+
+    writer = threading.Thread(target=late_writer)
+    writer.start()
+    assert numbered.wait(10)
+    # waits for the writer's lock
+    deleter = threading.Thread(target=lambda: app.test_client().delete(f'/api/notes/{first}'))
+    deleter.start()
+    try:
+        changes = client.get(f'/api/notes/changes?since={cursor}').get_json()
+    finally:
+        release.set()
+        writer.join()
+        deleter.join()
+    # neither the late note nor the delete queued behind it is visible yet
+    assert changes['notes'] == [] and changes['deleted'] == []
+    assert changes['cursor'] == cursor
+
+    changes = client.get(f'/api/notes/changes?since={cursor}').get_json()
+    assert [note['title'] for note in changes['notes']] == ['late']
+    assert changes['deleted'] == [first]
+    cursor = changes['cursor']
+
+    # moving a note is a change, and an unchanged cursor returns nothing
+    client.post('/api/notes/reorder', json={'id': second, 'after': None})
+    changes = client.get(f'/api/notes/changes?since={cursor}').get_json()
+    assert [note['id'] for note in changes['notes']] == [second]
+    changes = client.get(f"/api/notes/changes?since={changes['cursor']}").get_json()
+    assert changes['notes'] == [] and changes['deleted'] == []